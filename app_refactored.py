@@ -6,12 +6,22 @@ Supporte plusieurs langues sources et cibles avec cache de traduction.
 import streamlit as st
 import subprocess
 import sys
+import shutil
+import threading
+import asyncio
 from pathlib import Path
 import os
 import json
 
 # Import des modules refacturés
 from config import config
+
+# Étapes du pipeline importées en process (évite un démarrage Python,
+# les imports et le rechargement des clients API à chaque étape)
+from extract import extract_audio
+from transcribe_api import transcribe_with_api, get_audio_duration
+from translate import translate_srt
+from generate import run_dubbing
 from services.api_service import APIService
 from services.file_service import FileService
 from services.subtitle_service import SubtitleService
@@ -19,42 +29,158 @@ from services.tts_service import TTSService
 from services.ffmpeg_service import FFmpegService
 from utils.progress_tracker import ProgressTracker
 from languages import (
-    WHISPER_LANGUAGES, 
+    WHISPER_LANGUAGES,
     TARGET_LANGUAGES,
+    SOURCE_OPTIONS,
+    TARGET_OPTIONS,
+    SOURCE_CODES,
+    TARGET_CODES,
+    SOURCE_DEFAULT_IDX,
+    TARGET_DEFAULT_IDX,
     get_language_display
 )
 from translation_cache import get_cache_stats, clear_cache
 
+# Au-delà de cette taille, un fichier est servi via un handle plutôt que
+# gardé en mémoire dans le cache Streamlit
+MAX_CACHED_DOWNLOAD = 500 * 1024 * 1024
+
+# Répertoire servi tel quel par Streamlit (enableStaticServing)
+STATIC_DIR = Path(__file__).parent / "static"
+
+
+def _static_download_link(path: Path, job_id: str):
+    """
+    Publie un fichier dans le répertoire statique de Streamlit (lien dur).
+
+    Le navigateur télécharge alors directement depuis le disque, sans que
+    st.download_button ne matérialise les octets en mémoire — important
+    pour les vidéos de plusieurs GB. Retourne l'URL relative, ou None si
+    le lien dur est impossible (ex. volume différent).
+    """
+    target = STATIC_DIR / f"{job_id}_{path.name}"
+    try:
+        STATIC_DIR.mkdir(exist_ok=True)
+        if not target.exists():
+            os.link(path, target)
+    except OSError:
+        return None
+    return f"app/static/{target.name}"
+
+
+@st.cache_data(max_entries=8)
+def load_file_bytes(path: str, mtime_ns: int, size: int) -> bytes:
+    """
+    Lit un fichier en mémoire, avec cache tant qu'il ne change pas.
+
+    Clé = (chemin, mtime, taille) : les reruns Streamlit réutilisent les
+    octets déjà lus au lieu de relire le fichier à chaque interaction.
+    """
+    return Path(path).read_bytes()
+
+
+@st.cache_data(ttl=10)
+def cached_work_dir_size(path: str, _file_service) -> int:
+    """Taille du dossier de travail (scandir récursif), memoïsée 10 s."""
+    return _file_service.get_work_dir_size()
+
+
+@st.cache_data(ttl=5)
+def cached_cache_stats() -> dict:
+    """Statistiques du cache de traduction, rafraîchies au plus toutes les 5 s."""
+    return get_cache_stats()
+
+
+@st.cache_resource
+def _prewarm_whisper_imports():
+    """
+    Importe whisper (et torch) dans un thread démon, une fois par session.
+
+    Déclenché dès que le mode local est sélectionné dans la sidebar : les
+    secondes d'import à froid se paient pendant que l'utilisateur finit
+    de configurer, pas au premier clic sur « Lancer ».
+    """
+    def _imports():
+        try:
+            import transcribe  # noqa: F401 — tire whisper et torch
+        except Exception:
+            pass  # l'erreur réapparaîtra au vrai chargement, avec son message
+
+    thread = threading.Thread(target=_imports, daemon=True)
+    thread.start()
+    return thread
+
+
+@st.cache_resource(show_spinner="⏳ Chargement du modèle Whisper...")
+def get_local_whisper(model_size: str):
+    """
+    Charge le modèle Whisper local une fois par taille et par processus.
+
+    L'import reste paresseux : whisper (et torch) ne sont chargés qu'au
+    premier passage en mode local.
+    """
+    from transcribe import get_model
+    return get_model(model_size)
+
+
+@st.cache_resource
+def _export_api_key(api_key: str) -> bool:
+    """Expose la clé Groq dans l'environnement, une fois par processus."""
+    os.environ["GROQ_API_KEY"] = api_key
+    return True
+
+
+@st.cache_resource
+def get_api_service():
+    """
+    Construit l'APIService une seule fois par processus.
+
+    En cas de clé manquante, le constructeur affiche l'erreur et stoppe le
+    script : l'exception empêche la mise en cache, donc le prochain rerun
+    réessaie.
+    """
+    return APIService()
+
+
+@st.cache_resource
+def get_services():
+    """Construit les services une seule fois par processus (pas par rerun)."""
+    return (
+        FileService(config.work_dir),
+        SubtitleService(),
+        TTSService(config.tts_speakers),
+        FFmpegService(),
+    )
+
+
 def main():
-    # Initialisation des services
-    api_service = APIService()
-    file_service = FileService(config.work_dir)
-    subtitle_service = SubtitleService()
-    tts_service = TTSService(config.tts_speakers)
-    ffmpeg_service = FFmpegService()
+    # Initialisation des services (instances partagées entre les reruns)
+    api_service = get_api_service()
+    file_service, subtitle_service, tts_service, ffmpeg_service = get_services()
 
-    # Créer un fichier .env temporaire pour les scripts esclaves
-    api_service.create_env_file()
+    # Exposer la clé API via l'environnement (héritée par les sous-processus,
+    # lue par les étapes in-process) — plus d'écriture de .env sur disque,
+    # et une seule fois par processus au lieu d'à chaque rerun
+    _export_api_key(api_service.api_key)
 
     # Configuration de l'application
     st.set_page_config(page_title="Auto VOSTFR + Doublage", page_icon="🎬", layout="wide")
     st.title("🎬 Générateur de sous-titres & doublage IA")
     st.markdown("**Uploadez une vidéo et obtenez automatiquement des sous-titres traduits et/ou un doublage IA**")
 
-    # Sidebar pour les paramètres
-    params = setup_sidebar(tts_service)
+    # Sidebar pour les paramètres (publiés dans st.session_state)
+    setup_sidebar(tts_service, file_service)
 
     # Main content
     uploaded_file = st.file_uploader(
-        "📁 Choisissez une vidéo (MP4, MKV, AVI)", 
+        "📁 Choisissez une vidéo (MP4, MKV, AVI)",
         type=["mp4", "mkv", "avi"]
     )
 
     if uploaded_file is not None:
         process_video(
-            uploaded_file, 
-            params, 
-            file_service, 
+            uploaded_file,
+            file_service,
             subtitle_service, 
             tts_service, 
             ffmpeg_service,
@@ -62,39 +188,43 @@ def main():
         )
 
 
-def setup_sidebar(tts_service):
+def setup_sidebar(tts_service, file_service):
     """
-    Setup the sidebar with all the parameters
+    Setup the sidebar with all the parameters.
+
+    The widgets live in a st.fragment: changing a language or a voice
+    reruns only the sidebar, not the whole script (video preview, cache
+    stats query, etc.). The selected parameters are shared with the main
+    panel through st.session_state.
     """
+    _sidebar_fragment(tts_service, file_service)
+    return st.session_state["sidebar_params"]
+
+
+@st.fragment
+def _sidebar_fragment(tts_service, file_service):
     with st.sidebar:
         st.header("⚙️ Paramètres")
         
         # Sélection des langues
         st.subheader("🌍 Langues")
         
-        # Langue source
-        source_options = {
-            code: f"{info['emoji']} {info['name']}" 
-            for code, info in WHISPER_LANGUAGES.items()
-        }
+        # Langue source (options et indice par défaut pré-calculés à
+        # l'import de languages.py)
         source_lang = st.selectbox(
             "Langue source (audio)",
-            options=list(source_options.keys()),
-            format_func=lambda x: source_options[x],
-            index=list(source_options.keys()).index("ja"),
+            options=SOURCE_CODES,
+            format_func=lambda x: SOURCE_OPTIONS[x],
+            index=SOURCE_DEFAULT_IDX,
             help="Langue parlée dans la vidéo"
         )
-        
+
         # Langue cible
-        target_options = {
-            code: f"{info['emoji']} {info['name']}" 
-            for code, info in TARGET_LANGUAGES.items()
-        }
         target_lang = st.selectbox(
             "Langue cible (sous-titres)",
-            options=list(target_options.keys()),
-            format_func=lambda x: target_options[x],
-            index=list(target_options.keys()).index("fr"),
+            options=TARGET_CODES,
+            format_func=lambda x: TARGET_OPTIONS[x],
+            index=TARGET_DEFAULT_IDX,
             help="Langue des sous-titres générés"
         )
         
@@ -115,6 +245,10 @@ def setup_sidebar(tts_service):
                 value="small",
                 help="Plus grand = meilleure qualité, mais plus lent"
             )
+            # Importer torch/whisper en arrière-plan pendant que
+            # l'utilisateur finit de configurer : le premier lancement
+            # local ne paie plus les ~secondes d'import à froid
+            _prewarm_whisper_imports()
         else:
             model_size = "small"
         
@@ -157,17 +291,11 @@ def setup_sidebar(tts_service):
                     available_speakers = male_voices
                     default_speaker = "fr-FR-HenriNeural"
                 
-                # Formater les options avec label
-                speaker_options = {
-                    name: tts_service.get_voice_label(name)
-                    for name in available_speakers
-                }
-                
                 selected_speaker = st.selectbox(
                     "Voix",
-                    options=list(speaker_options.keys()),
-                    format_func=lambda x: speaker_options[x],
-                    index=list(speaker_options.keys()).index(default_speaker) if default_speaker in speaker_options else 0,
+                    options=available_speakers,
+                    format_func=tts_service.get_voice_label,
+                    index=available_speakers.index(default_speaker) if default_speaker in available_speakers else 0,
                     help="Choisissez la voix pour le doublage"
                 )
 
@@ -242,9 +370,10 @@ def setup_sidebar(tts_service):
         
         st.divider()
         
-        # Statistiques du cache
+        # Statistiques du cache (memoïsées : une requête SQLite toutes les
+        # 5 s au maximum, pas une par interaction)
         st.subheader("💾 Cache")
-        cache_stats = get_cache_stats()
+        cache_stats = cached_cache_stats()
         st.metric("Traductions en cache", cache_stats["total_entries"])
         
         if cache_stats["languages"]:
@@ -254,19 +383,30 @@ def setup_sidebar(tts_service):
         with col1:
             if st.button("🗑️ Cache", use_container_width=True):
                 clear_cache()
+                cached_cache_stats.clear()
                 st.success("Vidé !")
                 st.rerun()
         
         with col2:
-            if st.button("🗑️ Fichiers", use_container_width=True):
+            size_gb = cached_work_dir_size(str(file_service.work_dir), file_service) / (1024 ** 3)
+            confirm_clean = st.checkbox(
+                "Je confirme",
+                key="confirm_clean",
+                help="La suppression efface aussi les traitements en cours"
+            )
+            if st.button(f"🗑️ Fichiers ({size_gb:.1f} GB)", use_container_width=True, disabled=not confirm_clean):
                 try:
                     file_service.clean_work_directory()
+                    # Les liens durs publiés pour téléchargement gardent
+                    # les blocs disque vivants : on les retire aussi
+                    shutil.rmtree(STATIC_DIR, ignore_errors=True)
+                    cached_work_dir_size.clear()
                     st.success("Nettoyé !")
                 except Exception as e:
                     st.error(f"Erreur: {e}")
 
-    # Retourner les paramètres configurés
-    return {
+    # Partager les paramètres avec le panneau principal
+    st.session_state["sidebar_params"] = {
         'source_lang': source_lang,
         'target_lang': target_lang,
         'fast_mode': fast_mode,
@@ -283,12 +423,29 @@ def setup_sidebar(tts_service):
     }
 
 
-def process_video(uploaded_file, params, file_service, subtitle_service, tts_service, ffmpeg_service, api_service):
+@st.fragment
+def process_video(uploaded_file, file_service, subtitle_service, tts_service, ffmpeg_service, api_service):
     """
-    Process the uploaded video with the specified parameters
+    Process the uploaded video with the current sidebar parameters.
+
+    The whole panel is a st.fragment: clicking « Lancer » reruns only
+    this function, not the whole script (uploader, title, etc.). The
+    parameters are re-read from st.session_state on every fragment run,
+    so they always reflect the current sidebar state.
     """
-    # Sauvegarder le fichier uploadé
-    video_path = file_service.save_uploaded_file(uploaded_file, uploaded_file.name)
+    params = st.session_state["sidebar_params"]
+
+    # Identifiant de job adressé par contenu : même vidéo + mêmes réglages
+    # → même dossier de travail, les sorties existantes sont réutilisées
+    job_id = file_service.compute_job_id(
+        uploaded_file,
+        params['source_lang'],
+        params['target_lang'],
+        'api' if params['fast_mode'] else f"local-{params['model_size']}"
+    )
+
+    # Sauvegarder le fichier uploadé (copie sautée si déjà présent)
+    video_path = file_service.save_uploaded_file(uploaded_file, uploaded_file.name, job_id=job_id)
     
     source_display = f"{WHISPER_LANGUAGES[params['source_lang']]['emoji']} {WHISPER_LANGUAGES[params['source_lang']]['name']}"
     target_display = f"{TARGET_LANGUAGES[params['target_lang']]['emoji']} {TARGET_LANGUAGES[params['target_lang']]['name']}"
@@ -328,118 +485,148 @@ def process_video(uploaded_file, params, file_service, subtitle_service, tts_ser
         
         try:
             # Obtenir les chemins de sortie standard
-            output_paths = file_service.get_output_paths(video_path, params['target_lang'])
+            output_paths = file_service.get_output_paths(
+                video_path,
+                params['target_lang'],
+                speaker=params['selected_speaker'] if params['enable_tts'] else None
+            )
             
             step = 1
             
             # ===== Étape 1: Extraction audio =====
             progress_tracker.update(step, f"🎵 Étape {step}/{total_steps} : Extraction de l'audio...")
-            
-            result = subprocess.run(
-                [python_exe, "extract.py", str(video_path)],
-                capture_output=True,
-                text=True
+
+            # Le WAV intermédiaire n'est nécessaire qu'à Whisper local, à la
+            # diarisation et à la séparation. En mode API sans ces options,
+            # la transcription compresse ses chunks directement depuis la
+            # vidéo (ffmpeg -vn) : on évite d'écrire puis relire des
+            # centaines de MB de PCM.
+            needs_wav = (
+                not params['fast_mode']
+                or (params['enable_tts'] and (params['enable_diarization'] or params['keep_bg_music']))
             )
-            
-            if result.returncode != 0:
-                st.error(f"❌ Erreur lors de l'extraction audio:\n{result.stderr}")
-                st.stop()
-            
-            audio_file = output_paths["audio"]
+
+            if not needs_wav:
+                audio_file = video_path
+            elif output_paths["audio"].exists():
+                audio_file = output_paths["audio"]
+            else:
+                try:
+                    audio_file = extract_audio(video_path)
+                except subprocess.CalledProcessError as e:
+                    st.error(f"❌ Erreur lors de l'extraction audio:\n{e}")
+                    st.stop()
+
             step += 1
             
-            # ===== Étape : Diarisation (Optionnel) =====
-            diarization_data = None
+            # ===== Étapes en arrière-plan : diarisation et séparation =====
+            # Ces deux sous-processus ne dépendent que de l'audio extrait et
+            # leurs résultats ne servent qu'après la traduction : ils tournent
+            # donc en parallèle des appels réseau de transcription/traduction
+            # au lieu de les précéder séquentiellement.
+            diarize_proc = None
+            diar_json = None
             if params['enable_tts'] and params['enable_diarization']:
-                progress_tracker.update(step, f"🕵️ Étape {step}/{total_steps} : Diarisation (Identification des personnages)...")
-                
-                result = subprocess.run(
-                    [python_exe, "diarize.py", str(audio_file)],
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode == 0:
-                    try:
-                        diarization_data = json.loads(result.stdout)
-                        st.success("✅ Personnages identifiés !")
-                    except Exception as e:
-                        st.warning(f"⚠️ Erreur lecture diarisation: {e}")
+                diar_json = audio_file.with_suffix(".diar.json")
+                if diar_json.exists():
+                    # Résultat d'une exécution précédente sur le même job
+                    progress_tracker.update(step, f"🕵️ Étape {step}/{total_steps} : Diarisation réutilisée...")
                 else:
-                    st.warning(f"⚠️ Échec de la diarisation")
-                
+                    progress_tracker.update(step, f"🕵️ Étape {step}/{total_steps} : Diarisation lancée en arrière-plan...")
+
+                    # diarize.py écrit son JSON dans un fichier .diar.json à côté
+                    # de l'audio : rien n'est bufferisé via un pipe, tout le log
+                    # part dans diarize.log
+                    with open(audio_file.with_name("diarize.log"), "wb") as log_file:
+                        diarize_proc = subprocess.Popen(
+                            [python_exe, "diarize.py", str(audio_file)],
+                            stdout=log_file,
+                            stderr=subprocess.STDOUT
+                        )
                 step += 1
-            
-            # ===== Étape : Séparation audio (Optionnel) =====
-            bg_music_file = None
+
+            separate_proc = None
+            separate_log = None
             if params['enable_tts'] and params['keep_bg_music']:
-                progress_tracker.update(step, f"🎵 Étape {step}/{total_steps} : Séparation voix/musique (Demucs)...")
-                
-                result = subprocess.run(
-                    [python_exe, "separate.py", str(audio_file)],
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode == 0:
-                    bg_music_file = output_paths["bg_music"]
-                    st.success("✅ Musique de fond isolée !")
+                if output_paths["bg_music"].exists():
+                    progress_tracker.update(step, f"🎵 Étape {step}/{total_steps} : Musique de fond réutilisée...")
                 else:
-                    st.warning(f"⚠️ Échec de la séparation : {result.stderr}")
-                
+                    progress_tracker.update(step, f"🎵 Étape {step}/{total_steps} : Séparation voix/musique lancée en arrière-plan...")
+
+                    separate_log = audio_file.with_name("separate.log")
+                    with open(separate_log, "wb") as log_file:
+                        separate_proc = subprocess.Popen(
+                            [python_exe, "separate.py", str(audio_file)],
+                            stdout=log_file,
+                            stderr=subprocess.STDOUT
+                        )
                 step += 1
-            
+
             # ===== Étape 2: Transcription =====
-            if params['fast_mode']:
-                progress_tracker.update(step, f"🎤 Étape {step}/{total_steps} : Transcription API ({source_display})...")
-                transcribe_cmd = [
-                    python_exe, "transcribe_api.py", 
-                    str(audio_file),
-                    "-l", params['source_lang']
-                ]
-            else:
-                progress_tracker.update(step, f"🎤 Étape {step}/{total_steps} : Transcription locale ({source_display})...")
-                transcribe_cmd = [
-                    python_exe, "transcribe.py", 
-                    str(audio_file),
-                    "-l", params['source_lang'],
-                    "-m", params['model_size']
-                ]
-            
-            result = subprocess.run(
-                transcribe_cmd,
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                st.error(f"❌ Erreur lors de la transcription:\n{result.stderr}")
+            try:
+                if output_paths["srt_original"].exists():
+                    srt_file = output_paths["srt_original"]
+                elif params['fast_mode']:
+                    progress_tracker.update(step, f"🎤 Étape {step}/{total_steps} : Transcription API ({source_display})...")
+                    srt_file = transcribe_with_api(audio_file, params['source_lang'])
+                else:
+                    progress_tracker.update(step, f"🎤 Étape {step}/{total_steps} : Transcription locale ({source_display})...")
+                    # Import paresseux : whisper (torch) n'est chargé qu'en mode
+                    # local, et le modèle reste en cache pour toute la session
+                    get_local_whisper(params['model_size'])
+                    from transcribe import transcribe_local
+                    srt_file = transcribe_local(audio_file, params['source_lang'], params['model_size'])
+            except Exception as e:
+                st.error(f"❌ Erreur lors de la transcription:\n{e}")
                 st.stop()
-            
-            srt_file = output_paths["srt_original"]
+
             step += 1
             
             # ===== Étape 3: Traduction =====
             progress_tracker.update(step, f"🌐 Étape {step}/{total_steps} : Traduction → {target_display}...")
             
             srt_translated = output_paths["srt_translated"]
+
+            if not srt_translated.exists():
+                if params['source_lang'] == params['target_lang']:
+                    # Même langue des deux côtés : aucun appel API à faire
+                    shutil.copy(srt_file, srt_translated)
+                    st.info("ℹ️ Langues identiques, traduction ignorée.")
+                else:
+                    try:
+                        translate_srt(
+                            srt_file,
+                            srt_translated,
+                            params['source_lang'],
+                            params['target_lang']
+                        )
+                    except Exception as e:
+                        st.error(f"❌ Erreur lors de la traduction:\n{e}")
+                        st.stop()
             
-            result = subprocess.run(
-                [
-                    python_exe, "translate.py", 
-                    str(srt_file),
-                    "-s", params['source_lang'],
-                    "-t", params['target_lang'],
-                    "-o", str(srt_translated)
-                ],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                st.error(f"❌ Erreur lors de la traduction:\n{result.stderr}")
-                st.stop()
-            
+            # ===== Récupération des étapes en arrière-plan =====
+            diarization_data = None
+            if diar_json is not None:
+                if diarize_proc is not None and diarize_proc.wait() != 0:
+                    st.warning("⚠️ Échec de la diarisation")
+                else:
+                    try:
+                        diarization_data = json.loads(diar_json.read_text(encoding="utf-8"))
+                        st.success("✅ Personnages identifiés !")
+                    except Exception as e:
+                        st.warning(f"⚠️ Erreur lecture diarisation: {e}")
+
+            bg_music_file = None
+            if params['enable_tts'] and params['keep_bg_music']:
+                if separate_proc is not None and separate_proc.wait() != 0:
+                    st.warning("⚠️ Échec de la séparation")
+                    st.code(separate_log.read_text(errors="replace")[-4000:], language="")
+                elif output_paths["bg_music"].exists():
+                    bg_music_file = output_paths["bg_music"]
+                    st.success("✅ Musique de fond isolée !")
+                else:
+                    st.warning("⚠️ Échec de la séparation")
+
             # Appliquer la diarisation au SRT traduit
             if diarization_data:
                 subtitle_service.apply_diarization_to_srt(srt_translated, diarization_data, srt_translated)
@@ -456,31 +643,22 @@ def process_video(uploaded_file, params, file_service, subtitle_service, tts_ser
                 target_voices = tts_service.get_target_voices(params['target_lang'])
 
                 speakers_arg = tts_service.build_speakers_argument(
-                    params['selected_speaker'], 
-                    target_voices, 
+                    params['selected_speaker'],
+                    target_voices,
                     params['enable_diarization']
                 )
+                speakers = speakers_arg.split(",")
 
-                tts_cmd = [
-                    python_exe, "generate.py",
-                    str(srt_translated),
-                    "-l", params['target_lang'],
-                    "-s", speakers_arg,
-                    "-o", str(dubbed_audio)
-                ]
-                
-                result = subprocess.run(
-                    tts_cmd,
-                    capture_output=True,
-                    text=True
-                )
-                
-                if result.returncode != 0:
-                    st.warning(f"⚠️ Doublage échoué, continuation avec sous-titres uniquement:\n{result.stderr[:500]}")
-                    dubbed_audio = None
+                if dubbed_audio.exists():
+                    st.success("🎙️ Doublage réutilisé (déjà généré pour cette vidéo)")
                 else:
-                    st.success("🎙️ Doublage généré avec succès !")
-                
+                    try:
+                        asyncio.run(run_dubbing(str(srt_translated), speakers, str(dubbed_audio)))
+                        st.success("🎙️ Doublage généré avec succès !")
+                    except Exception as e:
+                        st.warning(f"⚠️ Doublage échoué, continuation avec sous-titres uniquement:\n{str(e)[:500]}")
+                        dubbed_audio = None
+
                 step += 1
             
             # ===== Étape finale: Fusion vidéo =====
@@ -503,11 +681,20 @@ def process_video(uploaded_file, params, file_service, subtitle_service, tts_ser
                 is_hardcode=params['is_hardcode']
             )
             
-            # Exécuter la commande FFmpeg
-            success = ffmpeg_service.execute_ffmpeg_command(cmd)
-            
+            # Exécuter la commande FFmpeg avec une vraie barre de
+            # progression (pilotée par -progress, pas par étapes fixes)
+            mux_progress = st.progress(0.0)
+            success = ffmpeg_service.execute_ffmpeg_command(
+                cmd,
+                on_progress=mux_progress.progress,
+                total_duration=get_audio_duration(video_path)
+            )
+            mux_progress.empty()
+
             if not success:
                 st.error(f"❌ Erreur lors de la fusion FFmpeg")
+                if ffmpeg_service.last_error_tail:
+                    st.code(ffmpeg_service.last_error_tail, language="")
                 st.stop()
             
             progress_tracker.complete()
@@ -518,52 +705,78 @@ def process_video(uploaded_file, params, file_service, subtitle_service, tts_ser
             else:
                 st.success(f"🎉 Vidéo sous-titrée créée : **{output_video.name}**")
             
-            # Statistiques du cache
-            new_stats = get_cache_stats()
+            # Statistiques du cache (invalidées : la traduction vient
+            # d'ajouter des entrées, la sidebar doit les voir aussi)
+            cached_cache_stats.clear()
+            new_stats = cached_cache_stats()
             st.info(f"💾 {new_stats['total_entries']} traductions en cache")
             
             # Boutons de téléchargement
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                with open(output_video, "rb") as f:
+                video_stat = output_video.stat()
+                if video_stat.st_size > MAX_CACHED_DOWNLOAD:
+                    # Trop gros pour le cache mémoire : lien statique
+                    # zéro-copie, sinon handle direct en dernier recours
+                    static_url = _static_download_link(output_video, job_id)
+                    if static_url:
+                        st.link_button(
+                            f"⬇️ Vidéo ({video_stat.st_size / (1024 ** 3):.1f} GB)",
+                            static_url,
+                            use_container_width=True
+                        )
+                    else:
+                        with open(output_video, "rb") as f:
+                            st.download_button(
+                                label="⬇️ Vidéo",
+                                data=f,
+                                file_name=output_video.name,
+                                mime="video/mp4",
+                                use_container_width=True
+                            )
+                else:
                     st.download_button(
                         label="⬇️ Vidéo",
-                        data=f,
+                        data=load_file_bytes(str(output_video), video_stat.st_mtime_ns, video_stat.st_size),
                         file_name=output_video.name,
                         mime="video/mp4",
                         use_container_width=True
                     )
-            
+
             with col2:
-                with open(srt_translated, "r", encoding="utf-8") as f:
+                srt_stat = srt_translated.stat()
+                st.download_button(
+                    label="⬇️ Sous-titres (.srt)",
+                    data=load_file_bytes(str(srt_translated), srt_stat.st_mtime_ns, srt_stat.st_size),
+                    file_name=srt_translated.name,
+                    mime="text/plain",
+                    use_container_width=True
+                )
+
+            with col3:
+                if dubbed_audio and dubbed_audio.exists():
+                    dubbed_stat = dubbed_audio.stat()
                     st.download_button(
-                        label="⬇️ Sous-titres (.srt)",
-                        data=f,
-                        file_name=srt_translated.name,
-                        mime="text/plain",
+                        label="⬇️ Audio doublé (.m4a)",
+                        data=load_file_bytes(str(dubbed_audio), dubbed_stat.st_mtime_ns, dubbed_stat.st_size),
+                        file_name=dubbed_audio.name,
+                        mime="audio/mp4",
                         use_container_width=True
                     )
             
-            with col3:
-                if dubbed_audio and dubbed_audio.exists():
-                    with open(dubbed_audio, "rb") as f:
-                        st.download_button(
-                            label="⬇️ Audio doublé (.wav)",
-                            data=f,
-                            file_name=dubbed_audio.name,
-                            mime="audio/wav",
-                            use_container_width=True
-                        )
-            
             # Aperçu du résultat
             st.subheader("📺 Aperçu du résultat")
             st.video(str(output_video))
             
-            # Aperçu des sous-titres
+            # Aperçu des sous-titres : les 2000 derniers octets (les dernières
+            # répliques générées), via un seek direct plutôt qu'une lecture
+            # depuis le début du fichier
             with st.expander("📝 Aperçu des sous-titres"):
-                with open(srt_translated, "r", encoding="utf-8") as f:
-                    preview = f.read(2000)
+                size = srt_translated.stat().st_size
+                with open(srt_translated, "rb") as f:
+                    f.seek(max(0, size - 2000))
+                    preview = f.read().decode("utf-8", errors="ignore")
                     st.code(preview, language="")
                     
         except Exception as e:
@@ -51,30 +51,48 @@ def assign_speakers_to_srt(srt_segments, diarization_segments):
     """
     Assigne un Speaker ID à chaque segment de sous-titre SRT
     en se basant sur les timestamps de la diarisation.
+
+    Vectorisé : un seul numpy.searchsorted sur les débuts de segments
+    triés affecte tous les milieux de sous-titres d'un coup, au lieu
+    d'un balayage Python de tous les segments par sous-titre (O(N·M)).
     """
-    if not diarization_segments:
+    if not diarization_segments or not srt_segments:
         for seg in srt_segments:
             seg['speaker'] = 0
         return srt_segments
 
-    for srt_seg in srt_segments:
-        srt_mid = (srt_seg['start'] + srt_seg['end']) / 2 / 1000 # ms to s
-        
-        # Trouver le segment de diarisation qui contient le milieu du sous-titre
-        assigned_speaker = 0
-        for d_seg in diarization_segments:
-            if d_seg['start'] <= srt_mid <= d_seg['end']:
-                assigned_speaker = d_seg['speaker']
-                break
-        
-        srt_seg['speaker'] = assigned_speaker
-        
+    import numpy as np
+
+    starts = np.array([d['start'] for d in diarization_segments], dtype=float)
+    ends = np.array([d['end'] for d in diarization_segments], dtype=float)
+    speakers = np.array([d['speaker'] for d in diarization_segments])
+
+    order = np.argsort(starts)
+    starts, ends, speakers = starts[order], ends[order], speakers[order]
+
+    # Milieu de chaque sous-titre, en secondes (timestamps SRT en ms)
+    mids = np.array(
+        [(s['start'] + s['end']) / 2 / 1000 for s in srt_segments], dtype=float
+    )
+    idx = np.searchsorted(starts, mids, side='right') - 1
+    clipped = np.clip(idx, 0, None)
+    valid = (idx >= 0) & (mids <= ends[clipped])
+
+    for seg, j, ok in zip(srt_segments, clipped, valid):
+        seg['speaker'] = int(speakers[j]) if ok else 0
+
     return srt_segments
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         audio_file = Path(sys.argv[1])
         res = run_diarization(audio_file)
+        # Écrire le résultat sur disque à côté de l'audio : le parent lit
+        # le JSON dans ce fichier (et peut le réutiliser à la prochaine
+        # exécution) au lieu de le bufferiser via un pipe.
+        audio_file.with_suffix(".diar.json").write_text(
+            json.dumps(res), encoding="utf-8"
+        )
         print(json.dumps(res))
     else:
         print("Usage: python diarize.py <audio_file>")
@@ -15,14 +15,26 @@ import numpy as np
 import soundfile as sf
 from tqdm import tqdm
 
+# Regex compilées une fois à l'import : un seul balayage du fichier
+# capture (timestamps, texte) par bloc, comme le parseur de translate.py
+_SRT_CUE = re.compile(
+    r'\d+\s*\r?\n'
+    r'(\d{2}:\d{2}:\d{2}[,.]\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2}[,.]\d{3})\s*\r?\n'
+    r'(.+?)(?=\r?\n\s*\r?\n|\Z)',
+    re.S
+)
+_SPEAKER_RE = re.compile(r'\[S(\d+)\]\s*(.*)', re.S)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
 def parse_srt_time(time_str: str) -> float:
-    """Convertit un timestamp SRT en secondes."""
-    # Format: HH:MM:SS,mmm
-    match = re.match(r'(\d{2}):(\d{2}):(\d{2})[,.](\d{3})', time_str)
-    if match:
-        h, m, s, ms = map(int, match.groups())
-        return h * 3600 + m * 60 + s + ms / 1000
-    return 0.0
+    """Convertit un timestamp SRT ('HH:MM:SS,mmm') en secondes.
+
+    Le format est à largeur fixe : découpage par indices, sans regex.
+    """
+    return (int(time_str[0:2]) * 3600 + int(time_str[3:5]) * 60
+            + int(time_str[6:8]) + int(time_str[9:12]) / 1000)
+
 
 def parse_srt(srt_path: Path):
     """Parse un fichier SRT et retourne une liste de segments."""
@@ -33,68 +45,100 @@ def parse_srt(srt_path: Path):
     with open(srt_path, "r", encoding="utf-8") as f:
         content = f.read()
 
-    # Séparer les blocs par double retour à la ligne
-    blocks = re.split(r'\n\n+', content.strip())
-
-    for block in blocks:
-        lines = block.strip().split('\n')
-        if len(lines) >= 3:
-            try:
-                # Parser les timestamps
-                time_match = re.match(
-                    r'(\d{2}:\d{2}:\d{2}[,.]\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2}[,.]\d{3})',
-                    lines[1]
-                )
-                if time_match:
-                    start = parse_srt_time(time_match.group(1))
-                    end = parse_srt_time(time_match.group(2))
-                    text = ' '.join(lines[2:]).strip()
-                    
-                    # Détection de speaker ID si présent dans le texte (format: [S1] Texte)
-                    speaker_id = 0
-                    speaker_match = re.match(r'\[S(\d+)\]\s*(.*)', text)
-                    if speaker_match:
-                        speaker_id = int(speaker_match.group(1))
-                        text = speaker_match.group(2)
-                    
-                    # Nettoyer les balises HTML/SRT
-                    text = re.sub(r'<[^>]+>', '', text)
-                    
-                    if text:
-                        segments.append({
-                            'start': start,
-                            'end': end,
-                            'text': text,
-                            'speaker_id': speaker_id
-                        })
-            except Exception:
-                continue
+    for match in _SRT_CUE.finditer(content):
+        try:
+            start = parse_srt_time(match.group(1))
+            end = parse_srt_time(match.group(2))
+            text = ' '.join(match.group(3).split())
+
+            # Détection de speaker ID si présent dans le texte (format: [S1] Texte)
+            speaker_id = 0
+            speaker_match = _SPEAKER_RE.match(text)
+            if speaker_match:
+                speaker_id = int(speaker_match.group(1))
+                text = speaker_match.group(2)
+
+            # Nettoyer les balises HTML/SRT
+            text = _TAG_RE.sub('', text)
+
+            if text:
+                segments.append({
+                    'start': start,
+                    'end': end,
+                    'text': text,
+                    'speaker_id': speaker_id
+                })
+        except Exception:
+            continue
     return segments
 
+def _soundfile_reads_mp3() -> bool:
+    """libsndfile >= 1.1 décode le MP3 nativement (sondé une fois à l'import)."""
+    try:
+        return "MPEG" in sf.available_formats()
+    except Exception:
+        return False
+
+
+# Quand libsndfile lit le MP3, les segments Edge-TTS sont gardés tels
+# quels : zéro sous-processus ffmpeg par segment (fork+exec + I/O disque
+# évités sur chacune des N répliques)
+SF_READS_MP3 = _soundfile_reads_mp3()
+
+
+# Tentatives de synthèse par segment : à forte concurrence le service
+# peut refuser ponctuellement une requête, un backoff exponentiel suffit
+TTS_RETRIES = 3
+
+
+async def _save_with_retry(text: str, speaker: str, path: Path):
+    """Synthèse Edge-TTS avec nouvelles tentatives (backoff 1 s, 2 s)."""
+    for attempt in range(TTS_RETRIES):
+        try:
+            communicate = edge_tts.Communicate(text, speaker)
+            await communicate.save(str(path))
+            return
+        except Exception:
+            if attempt == TTS_RETRIES - 1:
+                raise
+            await asyncio.sleep(2 ** attempt)
+
+
 async def generate_segment_audio(text: str, speaker: str, output_path: Path):
-    """Génère un fichier audio pour un segment de texte et le convertit en WAV."""
+    """Génère un fichier audio pour un segment de texte."""
+    if output_path.suffix == ".mp3":
+        # Lu directement par soundfile à l'assemblage : pas de conversion
+        await _save_with_retry(text, speaker, output_path)
+        return
+
     temp_mp3 = output_path.with_suffix(".mp3")
-    communicate = edge_tts.Communicate(text, speaker)
-    await communicate.save(str(temp_mp3))
-    
-    # Conversion MP3 -> WAV via FFmpeg (car soundfile lit mieux le WAV)
+    await _save_with_retry(text, speaker, temp_mp3)
+
+    # Conversion MP3 -> WAV via FFmpeg (libsndfile trop ancien pour le MP3)
     subprocess.run([
-        "ffmpeg", "-y", "-i", str(temp_mp3), 
+        "ffmpeg", "-y", "-i", str(temp_mp3),
         "-ar", "24000", "-ac", "1", str(output_path)
     ], capture_output=True, check=True)
-    
+
     # Nettoyage du MP3 temporaire
     if temp_mp3.exists():
         temp_mp3.unlink()
 
+# Nombre de synthèses Edge-TTS simultanées (service HTTP : la latence
+# réseau domine, l'étape TTS se divise d'autant). Surchargeable via
+# TTS_CONCURRENCY selon la tolérance du service aux rafales.
+MAX_CONCURRENT_TTS = int(os.environ.get("TTS_CONCURRENCY", "16"))
+
+
 async def generate_all_segments(segments, speakers, temp_dir):
     """Génère les fichiers audio pour tous les segments en parallèle."""
     temp_dir.mkdir(exist_ok=True)
-    semaphore = asyncio.Semaphore(5)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_TTS)
+    seg_ext = ".mp3" if SF_READS_MP3 else ".wav"
 
     async def sem_generate(segment, index):
         async with semaphore:
-            path = temp_dir / f"seg_{index}.wav"
+            path = temp_dir / f"seg_{index}{seg_ext}"
             # Utiliser la voix assignée au speaker_id, sinon la première voix de la liste
             if isinstance(speakers, list):
                 speaker_voice = speakers[segment.get('speaker_id', 0) % len(speakers)]
@@ -113,7 +157,7 @@ async def generate_all_segments(segments, speakers, temp_dir):
         results.append(res)
     
     # Récupérer les chemins dans l'ordre (seg_0, seg_1, ...)
-    return [temp_dir / f"seg_{i}.wav" for i in range(len(segments))]
+    return [temp_dir / f"seg_{i}{seg_ext}" for i in range(len(segments))]
 
 def assemble_audio(segments, audio_paths, output_path):
     """Assemble les segments audio avec numpy pour éviter la dépendance audioop/pydub."""
@@ -121,11 +165,14 @@ def assemble_audio(segments, audio_paths, output_path):
         return
 
     sample_rate = 24000
-    # Durée totale en secondes (dernier segment end + 1s)
-    total_duration = segments[-1]['end'] + 1.0
-    
-    # Créer un array de zéros pour l'audio final
-    final_audio = np.zeros(int(total_duration * sample_rate))
+    # Durée totale : fin du segment le plus tardif (le SRT n'est pas
+    # forcément trié) + marge pour la parole qui déborde de son segment.
+    # Alloué une seule fois : l'extension par np.concatenate dans la
+    # boucle était quadratique dans le pire cas.
+    total_duration = max(seg['end'] for seg in segments) + 10.0
+    # float32 : la sortie est du PCM 16 bits de toute façon, et le buffer
+    # d'une heure à 24 kHz passe de ~690 MB (float64) à ~345 MB
+    final_audio = np.zeros(int(total_duration * sample_rate), dtype=np.float32)
 
     for seg, path in zip(segments, audio_paths):
         if not path.exists():
@@ -139,15 +186,29 @@ def assemble_audio(segments, audio_paths, output_path):
             # Conversion en mono si nécessaire
             if len(data.shape) > 1:
                 data = np.mean(data, axis=1)
-                
+
+            # Les MP3 lus directement n'ont pas été ré-échantillonnés par
+            # ffmpeg : interpolation linéaire si la fréquence diffère
+            # (Edge-TTS sort normalement déjà du 24 kHz)
+            if sr != sample_rate:
+                n_out = int(len(data) * sample_rate / sr)
+                data = np.interp(
+                    np.linspace(0, len(data) - 1, n_out),
+                    np.arange(len(data)),
+                    data
+                )
+
+            # np.mean/np.interp remontent en float64 : on reste en float32
+            data = data.astype(np.float32, copy=False)
+
             start_sample = int(seg['start'] * sample_rate)
             end_sample = start_sample + len(data)
-            
+
             if end_sample > len(final_audio):
-                # Étendre l'audio si nécessaire
-                padding = np.zeros(end_sample - len(final_audio))
-                final_audio = np.concatenate([final_audio, padding])
-            
+                # Au-delà de la marge : tronquer plutôt que réallouer
+                end_sample = len(final_audio)
+                data = data[:end_sample - start_sample]
+
             # Superposer l'audio (mixage simple)
             final_audio[start_sample:end_sample] += data
         except Exception as e:
@@ -159,7 +220,20 @@ def assemble_audio(segments, audio_paths, output_path):
         final_audio = final_audio / max_val * 0.9
 
     # Sauvegarder le résultat final
-    sf.write(str(output_path), final_audio, sample_rate)
+    if output_path.suffix.lower() == ".m4a":
+        # Encodage AAC direct : la fusion vidéo finale peut alors faire
+        # -c:a copy au lieu de ré-encoder tout l'audio
+        temp_wav = output_path.with_suffix(".tmp.wav")
+        sf.write(str(temp_wav), final_audio, sample_rate, subtype='PCM_16')
+        subprocess.run([
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-i", str(temp_wav),
+            "-c:a", "aac", "-b:a", "192k",
+            str(output_path)
+        ], capture_output=True, check=True)
+        temp_wav.unlink()
+    else:
+        sf.write(str(output_path), final_audio, sample_rate, subtype='PCM_16')
 
 async def run_dubbing(srt_file, speakers, output_file):
     srt_path = Path(srt_file)
@@ -179,8 +253,8 @@ async def run_dubbing(srt_file, speakers, output_file):
         assemble_audio(segments, audio_paths, output_path)
         print(f"✅ Terminé ! Audio généré : {output_path}")
     finally:
-        # Nettoyage
-        for p in temp_dir.glob("*.wav"):
+        # Nettoyage (segments .wav ou .mp3 selon le support libsndfile)
+        for p in temp_dir.glob("seg_*"):
             try: p.unlink()
             except: pass
         if temp_dir.exists():
@@ -0,0 +1,33 @@
+"""
+Client Groq partagé entre les étapes du pipeline.
+
+Transcription (Whisper) et traduction (Llama 3) passent par le même
+endpoint : un client unique réutilise son pool de connexions HTTPS
+(keep-alive), donc l'enchaînement transcription → traduction ne repaye
+ni handshake TCP ni négociation TLS entre les deux appels.
+"""
+
+import os
+from groq import Groq
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement du fichier .env
+load_dotenv()
+
+# Client partagé, initialisé paresseusement pour que les modules qui
+# l'importent restent utilisables (mode in-process) sans clé configurée
+_client = None
+
+
+def get_client() -> Groq:
+    """Retourne le client Groq partagé (initialisé au premier appel)."""
+    global _client
+    if _client is None:
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise RuntimeError(
+                "La clé GROQ_API_KEY est introuvable dans le fichier .env"
+            )
+        # Timeout augmenté : 5 minutes (gros fichiers audio)
+        _client = Groq(api_key=api_key, timeout=300.0)
+    return _client
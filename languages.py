@@ -90,6 +90,26 @@ Règles importantes:
 - Réponds uniquement avec la traduction, sans guillemets ni explications."""
 
 
+def get_batch_translation_prompt(source_lang: str, target_lang: str, count: int) -> str:
+    """
+    Génère le prompt système pour la traduction par lot.
+
+    Args:
+        source_lang: Code de la langue source
+        target_lang: Code de la langue cible
+        count: Nombre de lignes à traduire
+
+    Returns:
+        Le prompt système adapté à une réponse numérotée ligne par ligne
+    """
+    base_prompt = get_translation_prompt(source_lang, target_lang)
+    return f"""{base_prompt}
+
+Tu recevras {count} répliques numérotées (une par ligne, format "N. texte").
+Traduis chaque réplique indépendamment et réponds avec exactement {count} lignes,
+au même format numéroté "N. traduction", dans le même ordre, sans rien ajouter."""
+
+
 def get_source_language_options() -> list:
     """Retourne la liste des options de langue source pour Streamlit."""
     return [
@@ -104,3 +124,24 @@ def get_target_language_options() -> list:
         (code, get_language_display(code, TARGET_LANGUAGES))
         for code in TARGET_LANGUAGES.keys()
     ]
+
+
+# Options pré-formatées pour les selectbox Streamlit.
+# Les langues ne changent pas à l'exécution : on les calcule une seule fois
+# à l'import au lieu de reconstruire les dicts à chaque rerun de l'app.
+SOURCE_OPTIONS = {
+    code: get_language_display(code, WHISPER_LANGUAGES)
+    for code in WHISPER_LANGUAGES
+}
+TARGET_OPTIONS = {
+    code: get_language_display(code, TARGET_LANGUAGES)
+    for code in TARGET_LANGUAGES
+}
+
+# Listes de codes et indices par défaut, précalculés pour les selectbox :
+# évite list(options.keys()).index(...) (scan linéaire + liste temporaire)
+# à chaque rerun.
+SOURCE_CODES = tuple(SOURCE_OPTIONS)
+TARGET_CODES = tuple(TARGET_OPTIONS)
+SOURCE_DEFAULT_IDX = SOURCE_CODES.index("ja")
+TARGET_DEFAULT_IDX = TARGET_CODES.index("fr")
@@ -9,6 +9,7 @@ import argparse
 from pathlib import Path
 
 from languages import WHISPER_LANGUAGES, TARGET_LANGUAGES
+from services.ffmpeg_service import ffmpeg_lang_for
 
 
 def run_step(command: list, step_name: str) -> bool:
@@ -180,13 +181,8 @@ def main():
         print(f"\n=== Étape {'5' if args.dub else '4'}/{'5' if args.dub else '4'} : Fusion Vidéo ===")
         
         # Mapper le code langue vers le code ISO 639-2 pour FFmpeg
-        lang_map = {
-            "fr": "fre", "en": "eng", "es": "spa", "de": "ger",
-            "it": "ita", "pt": "por", "zh": "chi", "ja": "jpn",
-            "ko": "kor", "ru": "rus", "ar": "ara", "hi": "hin",
-            "nl": "dut", "pl": "pol", "tr": "tur"
-        }
-        ffmpeg_lang = lang_map.get(target_lang, "und")
+        # (table partagée, construite une fois à l'import du service)
+        ffmpeg_lang = ffmpeg_lang_for(target_lang)
         
         if dubbed_audio and dubbed_audio.exists():
             # Fusion avec doublage (remplacer l'audio original)
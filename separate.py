@@ -4,18 +4,29 @@ from pathlib import Path
 import os
 import shutil
 
+def _demucs_device() -> str:
+    """Choisit le GPU quand il est disponible (Demucs y est bien plus rapide)."""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda"
+    except ImportError:
+        pass
+    return "cpu"
+
+
 def separate_audio(audio_path: Path):
     """
     Sépare les voix de la musique de fond en utilisant Demucs.
     """
     print(f"🎵 Séparation de l'audio : {audio_path}")
-    
+
     # Commande demucs : --two-stems=vocals sépare en voix et accompagnement
-    # -d cpu pour s'assurer que ça passe partout
+    # -d cuda quand un GPU est détecté, cpu sinon
     command = [
         "demucs",
         "--two-stems", "vocals",
-        "-d", "cpu",
+        "-d", _demucs_device(),
         str(audio_path)
     ]
     
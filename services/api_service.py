@@ -39,7 +39,12 @@ class APIService:
         """Get the loaded API key"""
         return self._api_key
     
-    def create_env_file(self) -> None:
-        """Create a temporary .env file for subprocess communication"""
-        with open(".env", "w") as f:
-            f.write(f"GROQ_API_KEY={self._api_key}")
\ No newline at end of file
+    def export_to_environment(self) -> None:
+        """
+        Expose the API key through os.environ.
+
+        In-process pipeline stages read os.getenv("GROQ_API_KEY") and child
+        processes inherit the environment, so no .env file needs to be
+        written to disk (which also kept the secret off the filesystem).
+        """
+        os.environ["GROQ_API_KEY"] = self._api_key
\ No newline at end of file
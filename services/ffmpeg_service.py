@@ -7,20 +7,122 @@ import re
 from pathlib import Path
 from typing import List, Dict, Optional
 
+# Mapping ISO 639-1 → ISO 639-2 pour les métadonnées FFmpeg.
+# Constant au runtime : construit une seule fois à l'import du module
+# au lieu d'une fois par instance de service (donc par rerun Streamlit).
+LANG_MAP_ISO639_2 = {
+    "fr": "fre", "en": "eng", "es": "spa", "de": "ger",
+    "it": "ita", "pt": "por", "zh": "chi", "ja": "jpn",
+    "ko": "kor", "ru": "rus", "ar": "ara", "hi": "hin",
+    "nl": "dut", "pl": "pol", "tr": "tur"
+}
+
+# Noms affichés dans les métadonnées des pistes (title=...)
+LANG_NAMES = {
+    "fr": "French", "en": "English", "es": "Spanish", "de": "German",
+    "it": "Italian", "pt": "Portuguese", "zh": "Chinese", "ja": "Japanese",
+    "ko": "Korean", "ru": "Russian", "ar": "Arabic", "hi": "Hindi",
+    "nl": "Dutch", "pl": "Polish", "tr": "Turkish"
+}
+
+
+def ffmpeg_lang_for(code: str) -> str:
+    """Return the ISO 639-2 code FFmpeg expects, or 'und' if unknown"""
+    return LANG_MAP_ISO639_2.get(code, "und")
+
+
+# Options communes de sortie MP4 :
+# - +faststart place l'atome moov en tête du fichier, donc st.video (et les
+#   navigateurs) démarrent la lecture sans télécharger tout le fichier
+# - -threads 0 laisse ffmpeg utiliser tous les cœurs (utile en hardcode)
+OUTPUT_FLAGS = ["-movflags", "+faststart", "-threads", "0"]
+
+# Caractères spéciaux des deux niveaux d'analyse ffmpeg :
+# - valeur d'option de filtre : ':' sépare les options, '\' et "'" sont spéciaux
+# - graphe de filtres : '[' ']' ';' ',' structurent le graphe
+_FILTER_OPTION_SPECIALS = re.compile(r"([\\':])")
+_FILTER_GRAPH_SPECIALS = re.compile(r"([\\'\[\],;])")
+
+
+def subtitles_filter(srt_path: Path) -> str:
+    """
+    Build a subtitles burn-in filter with a correctly escaped path.
+
+    ffmpeg parses the argument twice (filtergraph level, then filter
+    option level), so the path is backslash-escaped for both layers and
+    passed unquoted via filename= — no fragile quote nesting, and paths
+    with drive letters, quotes or brackets survive intact.
+    """
+    escaped = _FILTER_OPTION_SPECIALS.sub(r"\\\1", str(srt_path))
+    escaped = _FILTER_GRAPH_SPECIALS.sub(r"\\\1", escaped)
+    return f"subtitles=filename={escaped}"
+
 
 class FFmpegService:
     """
     Service class to handle FFmpeg operations for video processing
     """
-    
+
+    # Encodeurs matériels H.264 essayés dans l'ordre, avec leurs options
+    # qualité (équivalent approximatif de libx264 -crf 22)
+    HW_ENCODERS = {
+        "h264_nvenc": ["-preset", "p4", "-cq", "23"],
+        "h264_qsv": ["-global_quality", "23"],
+        # VideoToolbox (Apple) n'a pas de mode qualité constante fiable
+        # sur tous les Mac : débit cible fixe à la place
+        "h264_videotoolbox": ["-b:v", "5M"],
+    }
+
     def __init__(self):
-        self.lang_map = {
-            "fr": "fre", "en": "eng", "es": "spa", "de": "ger",
-            "it": "ita", "pt": "por", "zh": "chi", "ja": "jpn",
-            "ko": "kor", "ru": "rus", "ar": "ara", "hi": "hin",
-            "nl": "dut", "pl": "pol", "tr": "tur"
-        }
+        self.lang_map = LANG_MAP_ISO639_2
+        # Dernières lignes de log du dernier échec (pour affichage UI)
+        self.last_error_tail = ""
+        # Encodeur matériel détecté ("" = sondé, aucun ; None = pas encore sondé)
+        self._hw_encoder = None
+
+    def get_hw_encoder(self) -> str:
+        """
+        Return a usable H.264 hardware encoder name, or "" if none.
+
+        Probed once per service instance with a one-frame test encode:
+        an encoder can be listed by `ffmpeg -encoders` while the matching
+        GPU/driver is absent, so listing alone is not enough.
+        """
+        if self._hw_encoder is None:
+            self._hw_encoder = ""
+            for name in self.HW_ENCODERS:
+                try:
+                    result = subprocess.run(
+                        ["ffmpeg", "-hide_banner", "-loglevel", "error",
+                         "-f", "lavfi", "-i", "color=black:s=64x64:d=0.1",
+                         "-c:v", name, "-f", "null", "-"],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        timeout=15
+                    )
+                except (OSError, subprocess.TimeoutExpired):
+                    continue
+                if result.returncode == 0:
+                    self._hw_encoder = name
+                    break
+        return self._hw_encoder
     
+    def _video_codec_args(self, is_hardcode: bool) -> List[str]:
+        """
+        Video codec options shared by the dubbing mux variants.
+
+        Hardcoding burns subtitles into the frames and must re-encode;
+        every other case stream-copies the original video track. The
+        re-encode goes through a hardware encoder (NVENC/QSV/VideoToolbox)
+        when one is available, falling back to libx264.
+        """
+        if is_hardcode:
+            hw_encoder = self.get_hw_encoder()
+            if hw_encoder:
+                return ["-c:v", hw_encoder, *self.HW_ENCODERS[hw_encoder]]
+            return ["-c:v", "libx264", "-preset", "veryfast", "-crf", "22"]
+        return ["-c:v", "copy"]
+
     def build_ffmpeg_command(
         self,
         video_path: Path,
@@ -34,9 +136,11 @@ class FFmpegService:
         """
         Build an FFmpeg command based on the provided parameters
         """
-        # Map the language code for FFmpeg
-        ffmpeg_lang = self.lang_map.get(target_lang, "und")
-        
+        # Map the language code for FFmpeg; resolve the display name once
+        # instead of in every branch below
+        ffmpeg_lang = ffmpeg_lang_for(target_lang)
+        target_name = self._get_language_name(target_lang)
+
         # Determine if we're doing dubbing or just subtitles
         has_dubbing = dubbed_audio_path and dubbed_audio_path.exists()
         has_bg_music = bg_music_path and bg_music_path.exists()
@@ -46,7 +150,7 @@ class FFmpegService:
             if has_bg_music:
                 # Mix dubbed audio + background music
                 cmd = [
-                    "ffmpeg", "-y",
+                    "ffmpeg", "-y", "-loglevel", "error",
                     "-i", str(video_path),
                     "-i", str(dubbed_audio_path),
                     "-i", str(bg_music_path),
@@ -63,9 +167,8 @@ class FFmpegService:
                 
                 # Video filter if hardcoding subtitles
                 if is_hardcode and srt_path:
-                    clean_srt_path = str(srt_path).replace(":", "\\:").replace("'", "'\\''")
-                    cmd.extend(["-vf", f"subtitles='{clean_srt_path}'"])
-                
+                    cmd.extend(["-vf", subtitles_filter(srt_path)])
+
                 # Audio and video mapping
                 cmd.extend([
                     "-map", "0:v:0",      # Original video
@@ -77,7 +180,7 @@ class FFmpegService:
                 
                 # Video and audio codecs
                 cmd.extend([
-                    "-c:v", "libx264", "-preset", "veryfast", "-crf", "22" if is_hardcode else "copy",
+                    *self._video_codec_args(is_hardcode),
                     "-c:a", "aac", "-b:a", "192k",
                 ])
                 
@@ -85,17 +188,18 @@ class FFmpegService:
                     cmd.extend([
                         "-c:s", "mov_text",
                         "-metadata:s:s:0", f"language={ffmpeg_lang}",
-                        "-metadata:s:s:0", f"title={self._get_language_name(target_lang)}",
+                        "-metadata:s:s:0", f"title={target_name}",
                     ])
                 
                 cmd.extend([
                     "-metadata:s:a:0", f"language={ffmpeg_lang}",
+                    *OUTPUT_FLAGS,
                     str(output_path)
                 ])
             else:
                 # Dubbing without background music
                 cmd = [
-                    "ffmpeg", "-y",
+                    "ffmpeg", "-y", "-loglevel", "error",
                     "-i", str(video_path),
                     "-i", str(dubbed_audio_path),
                 ]
@@ -105,90 +209,140 @@ class FFmpegService:
                 
                 # Apply hardcode filter if needed
                 if is_hardcode and srt_path:
-                    clean_srt_path = str(srt_path).replace(":", "\\:").replace("'", "'\\''")
-                    cmd.extend(["-vf", f"subtitles='{clean_srt_path}'"])
-                
+                    cmd.extend(["-vf", subtitles_filter(srt_path)])
+
                 # Map streams
                 cmd.extend([
                     "-map", "0:v:0",      # Original video
                     "-map", "1:a:0",      # Dubbed audio
                 ])
-                
+
                 if not is_hardcode and srt_path and srt_path.exists():
                     cmd.extend(["-map", "2:0"])  # Subtitles
-                
+
                 # Video and audio codecs
+                # Stream-copy the dubbed audio when it is already AAC:
+                # re-encoding costs ~1x realtime on long videos for nothing
+                if dubbed_audio_path.suffix.lower() in (".m4a", ".aac"):
+                    audio_codec = ["-c:a", "copy"]
+                else:
+                    audio_codec = ["-c:a", "aac", "-b:a", "192k"]
                 cmd.extend([
-                    "-c:v", "libx264", "-preset", "veryfast", "-crf", "22" if is_hardcode else "copy",
-                    "-c:a", "aac", "-b:a", "192k",
+                    *self._video_codec_args(is_hardcode),
+                    *audio_codec,
                 ])
                 
                 if not is_hardcode and srt_path:
                     cmd.extend([
                         "-c:s", "mov_text",
                         "-metadata:s:s:0", f"language={ffmpeg_lang}",
-                        "-metadata:s:s:0", f"title={self._get_language_name(target_lang)}",
+                        "-metadata:s:s:0", f"title={target_name}",
                     ])
                 
                 cmd.extend([
                     "-metadata:s:a:0", f"language={ffmpeg_lang}",
+                    *OUTPUT_FLAGS,
                     str(output_path)
                 ])
         else:
             # Subtitles only
             if is_hardcode and srt_path:
                 # Hardcode subtitles into video
-                clean_srt_path = str(srt_path).replace(":", "\\:").replace("'", "'\\''")
                 cmd = [
-                    "ffmpeg", "-y",
+                    "ffmpeg", "-y", "-loglevel", "error",
                     "-i", str(video_path),
-                    "-vf", f"subtitles='{clean_srt_path}'",
-                    "-c:v", "libx264", "-preset", "veryfast", "-crf", "22",
+                    "-vf", subtitles_filter(srt_path),
+                    *self._video_codec_args(True),
                     "-c:a", "copy",
+                    *OUTPUT_FLAGS,
                     str(output_path)
                 ]
             else:
-                # Softcode subtitles (as separate stream)
+                # Softcode subtitles (as separate stream) : remux pur,
+                # aucun ré-encodage vidéo ni audio
                 cmd = [
-                    "ffmpeg", "-y",
+                    "ffmpeg", "-y", "-loglevel", "error",
                     "-i", str(video_path),
-                    "-i", str(srt_path) if srt_path else "",
-                    "-c", "copy",
-                    "-c:s", "mov_text",
-                    "-metadata:s:s:0", f"language={ffmpeg_lang}",
-                    "-metadata:s:s:0", f"title={self._get_language_name(target_lang)}",
-                    str(output_path)
                 ]
-                # Remove empty string if no srt_path
-                if not srt_path:
-                    cmd.remove("")
+                if srt_path:
+                    cmd.extend(["-i", str(srt_path)])
+                cmd.extend(["-c", "copy"])
+                if srt_path:
+                    cmd.extend([
+                        "-c:s", "mov_text",
+                        "-metadata:s:s:0", f"language={ffmpeg_lang}",
+                        "-metadata:s:s:0", f"title={target_name}",
+                    ])
+                cmd.extend([*OUTPUT_FLAGS, str(output_path)])
         
         return cmd
     
-    def execute_ffmpeg_command(self, cmd: List[str]) -> bool:
+    def execute_ffmpeg_command(
+        self,
+        cmd: List[str],
+        on_progress=None,
+        total_duration: Optional[float] = None
+    ) -> bool:
         """
-        Execute an FFmpeg command and return success status
+        Execute an FFmpeg command and return success status.
+
+        Output is streamed to a .log file next to the target file instead of
+        being buffered in memory (ffmpeg progress output can reach MBs and a
+        full pipe would block the encode). On failure the log tail is kept in
+        self.last_error_tail for display.
+
+        With on_progress and total_duration, ffmpeg runs with
+        `-progress pipe:1` and on_progress(fraction) is called as the
+        encode advances — real progress instead of coarse step updates.
         """
+        log_path = Path(cmd[-1]).with_suffix(".log")
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True
-            )
-            return result.returncode == 0
+            if on_progress is not None and total_duration:
+                full_cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+                with open(log_path, "wb") as log_file:
+                    proc = subprocess.Popen(
+                        full_cmd,
+                        stdout=subprocess.PIPE,
+                        stderr=log_file,
+                        text=True
+                    )
+                    for line in proc.stdout:
+                        if line.startswith("out_time_us="):
+                            try:
+                                done = int(line.split("=", 1)[1]) / (total_duration * 1e6)
+                            except ValueError:
+                                continue
+                            on_progress(min(1.0, done))
+                    returncode = proc.wait()
+            else:
+                with open(log_path, "wb") as log_file:
+                    returncode = subprocess.run(
+                        cmd,
+                        stdout=log_file,
+                        stderr=subprocess.STDOUT
+                    ).returncode
+
+            if returncode == 0:
+                self.last_error_tail = ""
+                return True
+            self.last_error_tail = self._read_log_tail(log_path)
+            return False
         except Exception:
+            self.last_error_tail = self._read_log_tail(log_path)
             return False
+
+    def _read_log_tail(self, log_path: Path, max_chars: int = 4000) -> str:
+        """Read the last max_chars of a log file (empty string if unreadable)"""
+        try:
+            text = log_path.read_text(errors="replace")
+            return text[-max_chars:]
+        except OSError:
+            return ""
     
     def _get_language_name(self, lang_code: str) -> str:
         """
         Get the language name from the language code
-        This is a simplified version - in a real implementation, 
+        This is a simplified version - in a real implementation,
         this would come from a proper language mapping
         """
-        lang_names = {
-            "fr": "French", "en": "English", "es": "Spanish", "de": "German",
-            "it": "Italian", "pt": "Portuguese", "zh": "Chinese", "ja": "Japanese",
-            "ko": "Korean", "ru": "Russian", "ar": "Arabic", "hi": "Hindi",
-            "nl": "Dutch", "pl": "Polish", "tr": "Turkish"
-        }
-        return lang_names.get(lang_code, "Unknown")
\ No newline at end of file
+        return LANG_NAMES.get(lang_code, "Unknown")
\ No newline at end of file
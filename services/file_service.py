@@ -2,7 +2,11 @@
 File Service for handling file operations
 """
 
+import hashlib
+import os
 import shutil
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -11,35 +15,161 @@ class FileService:
     """
     Service class to handle file operations like saving, cleaning, and managing work directories
     """
-    
+
     def __init__(self, work_dir: Path = Path("uploads")):
         self.work_dir = work_dir
         self.work_dir.mkdir(exist_ok=True)
-    
-    def save_uploaded_file(self, uploaded_file, filename: str) -> Path:
-        """Save an uploaded file to the work directory"""
-        file_path = self.work_dir / filename
+
+    # Taille des blocs copiés lors de la sauvegarde d'un upload (4 MB) :
+    # assez grand pour amortir les syscalls sur des vidéos de plusieurs GB,
+    # assez petit pour garder la mémoire bornée
+    UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+    # Quantité de données hachées en tête de fichier pour l'identifiant de job (1 MB)
+    JOB_ID_SAMPLE_SIZE = 1024 * 1024
+
+    def compute_job_id(self, uploaded_file, *params) -> str:
+        """
+        Compute a content-addressed job identifier for an upload.
+
+        Hashes the first megabyte of the file plus its size and the given
+        processing parameters, so identical (video, settings) pairs map to
+        the same work subdirectory and their outputs can be reused.
+
+        blake2b is noticeably faster than sha256 on large buffers and is
+        in the stdlib; cryptographic strength is irrelevant here, only
+        collision resistance for cache keys.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        uploaded_file.seek(0)
+        h.update(uploaded_file.read(self.JOB_ID_SAMPLE_SIZE))
+        uploaded_file.seek(0)
+        h.update(str(getattr(uploaded_file, "size", "")).encode())
+        for param in params:
+            h.update(b"|" + str(param).encode())
+        return h.hexdigest()[:16]
+
+    def get_job_dir(self, job_id: str) -> Path:
+        """Get (and create) the work subdirectory for a job"""
+        job_dir = self.work_dir / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        return job_dir
+
+    def save_uploaded_file(self, uploaded_file, filename: str, job_id: Optional[str] = None) -> Path:
+        """
+        Save an uploaded file to the work directory.
+
+        The upload is streamed to disk in fixed-size chunks instead of
+        materializing the whole file in memory with getbuffer(), so memory
+        usage stays O(chunk_size) even for multi-GB videos.
+
+        With a job_id, the file goes into that job's subdirectory and the
+        copy is skipped entirely when a file of the same size is already
+        there (same upload re-processed after a widget interaction).
+        """
+        dest_dir = self.get_job_dir(job_id) if job_id else self.work_dir
+        file_path = dest_dir / filename
+
+        size = getattr(uploaded_file, "size", None)
+        if job_id and size is not None and file_path.exists() and file_path.stat().st_size == size:
+            return file_path
+
+        if job_id and size is not None:
+            # Même vidéo déjà sauvegardée pour un autre job (autres réglages) ?
+            # Un hardlink évite de réécrire le fichier complet sur disque.
+            uploaded_file.seek(0)
+            head = uploaded_file.read(self.UPLOAD_CHUNK_SIZE)
+            existing = self._find_existing_upload(filename, size, head)
+            if existing is not None:
+                try:
+                    os.link(existing, file_path)
+                    return file_path
+                except OSError:
+                    pass  # systèmes de fichiers sans hardlink : copie normale
+
+        uploaded_file.seek(0)
         with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+            shutil.copyfileobj(uploaded_file, f, length=self.UPLOAD_CHUNK_SIZE)
         return file_path
-    
+
+    def _find_existing_upload(self, filename: str, size: int, head: bytes) -> Optional[Path]:
+        """
+        Find the same upload in another job directory.
+
+        A candidate matches on name, exact size and identical leading bytes,
+        which is enough to identify the same uploaded video.
+        """
+        for candidate in self.work_dir.glob(f"*/{filename}"):
+            try:
+                if candidate.stat().st_size != size:
+                    continue
+                with open(candidate, "rb") as f:
+                    if f.read(len(head)) == head:
+                        return candidate
+            except OSError:
+                continue
+        return None
+
+    def get_work_dir_size(self) -> int:
+        """
+        Total size of the work directory in bytes.
+
+        Iterative os.scandir walk: DirEntry carries cached stat info, so
+        this avoids one stat syscall per file compared to os.walk+getsize.
+        """
+        total = 0
+        stack = [self.work_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+        return total
+
     def clean_work_directory(self) -> bool:
-        """Clean all files in the work directory"""
+        """
+        Clean all files in the work directory.
+
+        The directory is atomically renamed aside and recreated, then the
+        actual deletion runs in a background thread: the UI gets its fresh
+        work directory in O(1) instead of blocking while thousands of
+        intermediate files are unlinked.
+        """
         try:
-            shutil.rmtree(self.work_dir)
+            trash = self.work_dir.with_name(f"{self.work_dir.name}_trash_{time.time_ns()}")
+            self.work_dir.rename(trash)
             self.work_dir.mkdir(exist_ok=True)
+            threading.Thread(
+                target=shutil.rmtree, args=(trash,), kwargs={"ignore_errors": True}, daemon=True
+            ).start()
             return True
         except Exception:
             return False
-    
-    def get_output_paths(self, video_path: Path, target_lang: str) -> dict:
-        """Get standard output file paths based on video path and target language"""
+
+    def get_output_paths(self, video_path: Path, target_lang: str, speaker: Optional[str] = None) -> dict:
+        """
+        Get standard output file paths based on video path and target language.
+
+        The dubbed-audio name includes the speaker so changing voice in the
+        sidebar produces a fresh file instead of reusing the previous one.
+        """
+        dubbed_stem = f"{video_path.stem}_{target_lang}"
+        if speaker:
+            dubbed_stem += f"_{speaker}"
         return {
             "audio": video_path.with_suffix(".wav"),
             "srt_original": video_path.with_suffix(".srt"),
             "srt_translated": video_path.with_name(f"{video_path.stem}_{target_lang}.srt"),
-            "dubbed_audio": video_path.with_name(f"{video_path.stem}_{target_lang}_dubbed.wav"),
+            # .m4a (AAC) : généré déjà compressé pour que la fusion finale
+            # soit un simple stream-copy
+            "dubbed_audio": video_path.with_name(f"{dubbed_stem}_dubbed.m4a"),
             "output_video": video_path.with_name(f"{video_path.stem}_dubbed.mp4"),
             "subtitle_video": video_path.with_name(f"{video_path.stem}_vostfr.mp4"),
             "bg_music": video_path.with_name(f"{video_path.stem}_bg.wav")
-        }
\ No newline at end of file
+        }
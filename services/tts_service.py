@@ -13,7 +13,13 @@ class TTSService:
     
     def __init__(self, available_voices: Dict[str, dict]):
         self.available_voices = available_voices
-    
+        # The voice catalog never changes after construction: split by
+        # gender once here instead of re-filtering on every Streamlit
+        # rerun of the sidebar.
+        self._voices_by_gender: Dict[str, List[str]] = {}
+        for name, info in available_voices.items():
+            self._voices_by_gender.setdefault(info["gender"], []).append(name)
+
     def get_target_voices(self, target_lang: str) -> List[str]:
         """
         Get list of available voices for a target language
@@ -34,12 +40,9 @@ class TTSService:
     
     def get_voices_by_gender(self, gender: str) -> List[str]:
         """
-        Get list of voices filtered by gender
+        Get list of voices filtered by gender (precomputed at construction)
         """
-        return [
-            name for name, info in self.available_voices.items()
-            if info["gender"] == gender
-        ]
+        return self._voices_by_gender.get(gender, [])
     
     def get_voice_label(self, voice_name: str) -> str:
         """
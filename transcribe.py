@@ -8,8 +8,29 @@ import sys
 import argparse
 from pathlib import Path
 
+import torch
+
 from languages import WHISPER_LANGUAGES, get_whisper_code
 
+# Modèles Whisper déjà chargés, par taille. En mode in-process (app
+# Streamlit), le modèle reste chaud entre deux transcriptions au lieu
+# d'être rechargé à chaque appel (~plusieurs secondes et GB de RAM).
+_models = {}
+
+
+def get_device() -> str:
+    """Retourne le device de calcul : CUDA si disponible, sinon CPU."""
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def get_model(model_size: str):
+    """Retourne le modèle Whisper demandé (chargé une seule fois par taille)."""
+    if model_size not in _models:
+        device = get_device()
+        print(f"⏳ Chargement du modèle Whisper ({model_size}, {device})...")
+        _models[model_size] = whisper.load_model(model_size, device=device)
+    return _models[model_size]
+
 
 def format_time(t: float) -> str:
     """Convertit les secondes en format SRT (HH:MM:SS,mmm)"""
@@ -40,13 +61,15 @@ def transcribe_local(audio_path: Path, language: str = "ja", model_size: str = "
     print(f"📦 Modèle: {model_size}")
     print(f"📁 Fichier: {audio_path}")
     
-    # Charger le modèle
-    print(f"⏳ Chargement du modèle Whisper ({model_size})...")
-    model = whisper.load_model(model_size)
+    # Charger le modèle (réutilisé s'il est déjà en mémoire)
+    model = get_model(model_size)
     
-    # Préparer les arguments de transcription
+    # Préparer les arguments de transcription.
+    # fp16 uniquement sur GPU : sur CPU Whisper retombe en fp32 avec un
+    # avertissement à chaque segment.
     transcribe_kwargs = {
-        "task": "transcribe"
+        "task": "transcribe",
+        "fp16": get_device() == "cuda"
     }
     
     # Ajouter la langue seulement si ce n'est pas "auto"
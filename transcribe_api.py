@@ -3,33 +3,16 @@ Script de transcription via l'API Groq Whisper.
 Supporte plusieurs langues sources avec chunking pour les longs fichiers.
 """
 
-import os
 import sys
 import subprocess
 import argparse
 from pathlib import Path
-from groq import Groq
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 import time
 
+from groq_client import get_client
 from languages import WHISPER_LANGUAGES, get_whisper_code
 
-# Charger les variables d'environnement
-load_dotenv()
-
-# Récupération de la clé API
-api_key = os.getenv("GROQ_API_KEY")
-
-if not api_key:
-    print("❌ Erreur : La clé GROQ_API_KEY est introuvable dans le fichier .env")
-    sys.exit(1)
-
-# Configuration du client Groq avec timeout augmenté
-client = Groq(
-    api_key=api_key,
-    timeout=300.0  # 5 minutes timeout
-)
-
 # Mots/phrases typiques des hallucinations Whisper
 HALLUCINATION_PATTERNS = [
     "ご視聴ありがとうございました",
@@ -83,18 +66,23 @@ def is_hallucination(text: str, all_texts: list) -> bool:
     return False
 
 
-def compress_audio_chunk(audio_path: Path, output_path: Path, start: float, duration: float) -> Path:
+def compress_audio_chunk(audio_path: Path, start: float, duration: float) -> bytes:
     """
-    Extrait et compresse un segment audio.
-    
+    Extrait et compresse un segment audio en MP3, directement en mémoire.
+
+    ffmpeg écrit sur stdout (pipe:1) : aucun fichier temporaire n'est créé
+    ni relu avant l'envoi à l'API.
+
     Args:
         audio_path: Fichier audio source
-        output_path: Chemin de sortie
         start: Début du segment en secondes
         duration: Durée du segment en secondes
+
+    Returns:
+        Le segment compressé (bytes MP3)
     """
     command = [
-        "ffmpeg", "-y",
+        "ffmpeg",
         "-ss", str(start),
         "-i", str(audio_path),
         "-t", str(duration),
@@ -102,44 +90,47 @@ def compress_audio_chunk(audio_path: Path, output_path: Path, start: float, dura
         "-ar", "16000",
         "-ac", "1",
         "-b:a", "64k",
-        str(output_path)
+        "-f", "mp3",
+        "pipe:1"
     ]
-    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return output_path
+    result = subprocess.run(
+        command, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    return result.stdout
 
 
-def transcribe_chunk(chunk_path: Path, language: str, chunk_index: int, total_chunks: int) -> dict:
+def transcribe_chunk(chunk_name: str, chunk_bytes: bytes, language: str, chunk_index: int, total_chunks: int) -> dict:
     """
-    Transcrit un seul chunk audio.
-    
+    Transcrit un seul chunk audio (déjà compressé en mémoire).
+
     Returns:
         dict avec 'segments' (liste) et 'language' (détectée)
     """
     whisper_code = get_whisper_code(language)
-    
-    print(f"   📦 Chunk {chunk_index}/{total_chunks}: {chunk_path.stat().st_size / 1024:.0f} KB")
-    
-    with open(chunk_path, "rb") as audio_file:
-        api_kwargs = {
-            "file": (chunk_path.name, audio_file.read()),
-            "model": "whisper-large-v3-turbo",
-            "response_format": "verbose_json",
-        }
-        
-        if whisper_code:
-            api_kwargs["language"] = whisper_code
-        
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                transcription = client.audio.transcriptions.create(**api_kwargs)
-                break
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"   ⚠️ Retry {attempt + 1}/{max_retries}...")
-                    time.sleep(2)
-                else:
-                    raise e
+
+    print(f"   📦 Chunk {chunk_index}/{total_chunks}: {len(chunk_bytes) / 1024:.0f} KB")
+
+    api_kwargs = {
+        "file": (chunk_name, chunk_bytes),
+        "model": "whisper-large-v3-turbo",
+        "response_format": "verbose_json",
+    }
+
+    if whisper_code:
+        api_kwargs["language"] = whisper_code
+
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            transcription = get_client().audio.transcriptions.create(**api_kwargs)
+            break
+        except Exception as e:
+            if attempt < max_retries - 1:
+                print(f"   ⚠️ Retry {attempt + 1}/{max_retries}...")
+                time.sleep(2)
+            else:
+                raise e
     
     segments = []
     if hasattr(transcription, 'segments') and transcription.segments:
@@ -184,59 +175,67 @@ def transcribe_with_api(audio_path: Path, language: str = "ja") -> Path:
     CHUNK_DURATION = 600  # 10 minutes par chunk
     MAX_CHUNK_SIZE_MB = 20  # Limite safe
     
-    try:
-        all_segments = []
-        time_offset = 0.0
-        temp_files = []
-        
-        if duration <= CHUNK_DURATION:
-            # Un seul chunk
-            print("📦 Fichier court, pas de chunking nécessaire")
-            
-            # Compresser
-            compressed = audio_path.with_suffix(".mp3")
-            compress_audio_chunk(audio_path, compressed, 0, duration)
-            temp_files.append(compressed)
-            
-            file_size = compressed.stat().st_size / (1024 * 1024)
-            print(f"📊 Taille compressée: {file_size:.1f} MB")
-            
-            if file_size > MAX_CHUNK_SIZE_MB:
-                print("❌ Fichier trop volumineux pour l'API")
-                print("💡 Utilisez le mode local (Whisper) pour les longs fichiers")
-                for f in temp_files:
-                    if f.exists():
-                        f.unlink()
-                sys.exit(1)
-            
-            print("🔄 Transcription en cours...")
-            result = transcribe_chunk(compressed, language, 1, 1)
-            all_segments = list(result.get('segments', []))
-            
-            if result.get('language'):
-                print(f"🔍 Langue détectée: {result['language']}")
-        
-        else:
-            # Multi-chunks
-            num_chunks = int(duration // CHUNK_DURATION) + 1
-            print(f"📂 Découpage en {num_chunks} chunks de {CHUNK_DURATION//60} min")
-            
+    all_segments = []
+
+    if duration <= CHUNK_DURATION:
+        # Un seul chunk
+        print("📦 Fichier court, pas de chunking nécessaire")
+
+        # Compresser (en mémoire, pas de .mp3 intermédiaire)
+        chunk_bytes = compress_audio_chunk(audio_path, 0, duration)
+
+        file_size = len(chunk_bytes) / (1024 * 1024)
+        print(f"📊 Taille compressée: {file_size:.1f} MB")
+
+        if file_size > MAX_CHUNK_SIZE_MB:
+            raise RuntimeError(
+                "Fichier trop volumineux pour l'API — "
+                "utilisez le mode local (Whisper) pour les longs fichiers"
+            )
+
+        print("🔄 Transcription en cours...")
+        result = transcribe_chunk(f"{audio_path.stem}.mp3", chunk_bytes, language, 1, 1)
+        all_segments = list(result.get('segments', []))
+
+        if result.get('language'):
+            print(f"🔍 Langue détectée: {result['language']}")
+
+    else:
+        # Multi-chunks
+        num_chunks = int(duration // CHUNK_DURATION) + 1
+        print(f"📂 Découpage en {num_chunks} chunks de {CHUNK_DURATION//60} min")
+
+        def prepare_chunk(i: int):
+            """Compresse le chunk i et retourne (bytes, offset) ou None."""
+            chunk_start = i * CHUNK_DURATION
+            chunk_dur = min(CHUNK_DURATION, duration - chunk_start)
+
+            if chunk_dur < 1:
+                return None
+
+            return compress_audio_chunk(audio_path, chunk_start, chunk_dur), chunk_start
+
+        # Pipeline : pendant que le chunk i est transcrit (réseau),
+        # le chunk i+1 est compressé par ffmpeg (CPU) en arrière-plan
+        with ThreadPoolExecutor(max_workers=1) as compressor:
+            next_chunk = compressor.submit(prepare_chunk, 0)
+
             for i in range(num_chunks):
-                chunk_start = i * CHUNK_DURATION
-                chunk_dur = min(CHUNK_DURATION, duration - chunk_start)
-                
-                if chunk_dur < 1:
+                prepared = next_chunk.result()
+                if i + 1 < num_chunks:
+                    next_chunk = compressor.submit(prepare_chunk, i + 1)
+
+                if prepared is None:
                     continue
-                
-                # Créer le chunk compressé
-                chunk_path = audio_path.with_name(f"{audio_path.stem}_chunk{i+1}.mp3")
-                compress_audio_chunk(audio_path, chunk_path, chunk_start, chunk_dur)
-                temp_files.append(chunk_path)
-                
+                chunk_bytes, chunk_start = prepared
+
                 # Transcrire
-                print(f"🔄 Transcription chunk {i+1}/{num_chunks} ({chunk_start//60:.0f}-{(chunk_start+chunk_dur)//60:.0f} min)...")
-                result = transcribe_chunk(chunk_path, language, i+1, num_chunks)
-                
+                print(f"🔄 Transcription chunk {i+1}/{num_chunks} ({chunk_start//60:.0f}-{(chunk_start+min(CHUNK_DURATION, duration - chunk_start))//60:.0f} min)...")
+                result = transcribe_chunk(
+                    f"{audio_path.stem}_chunk{i+1}.mp3", chunk_bytes,
+                    language, i+1, num_chunks
+                )
+
                 # Ajouter les segments avec offset temporel
                 for seg in result.get('segments', []):
                     adjusted_seg = {
@@ -245,64 +244,48 @@ def transcribe_with_api(audio_path: Path, language: str = "ja") -> Path:
                         'text': seg.get('text', '')
                     }
                     all_segments.append(adjusted_seg)
-                
+
                 # Petit délai entre les chunks pour éviter le rate limiting
                 if i < num_chunks - 1:
                     time.sleep(1)
-        
-        # Nettoyer les fichiers temporaires
-        for f in temp_files:
-            if f.exists():
-                f.unlink()
-        
-        # Collecter tous les textes pour la détection d'hallucinations
-        all_texts = [seg.get('text', '').strip() for seg in all_segments]
-        
-        # Créer le fichier SRT
-        srt_path = audio_path.with_suffix(".srt")
-        valid_segments = 0
-        hallucination_count = 0
-        
-        with open(srt_path, "w", encoding="utf-8") as f:
-            segment_index = 1
-            for segment in all_segments:
-                start = segment.get('start', 0)
-                end = segment.get('end', 0)
-                text = segment.get('text', '').strip()
-                
-                if is_hallucination(text, all_texts):
-                    hallucination_count += 1
-                    continue
-                
-                f.write(f"{segment_index}\n")
-                f.write(f"{format_time(start)} --> {format_time(end)}\n")
-                f.write(f"{text}\n\n")
-                segment_index += 1
-                valid_segments += 1
-        
-        if hallucination_count > 0:
-            print(f"🔍 {hallucination_count} hallucinations filtrées")
-        
-        print(f"✅ {valid_segments} segments → {srt_path}")
-        
-        # Aperçu
-        with open(srt_path, "r", encoding="utf-8") as f:
-            preview = f.read(600)
-            if preview.strip():
-                print(f"\n📄 Aperçu:\n{preview}")
-        
-        return srt_path
-        
-    except Exception as e:
-        # Nettoyer en cas d'erreur
-        for f in temp_files if 'temp_files' in dir() else []:
-            if f.exists():
-                f.unlink()
-        
-        print(f"❌ Erreur lors de la transcription: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+
+    # Collecter tous les textes pour la détection d'hallucinations
+    all_texts = [seg.get('text', '').strip() for seg in all_segments]
+    
+    # Créer le fichier SRT
+    srt_path = audio_path.with_suffix(".srt")
+    valid_segments = 0
+    hallucination_count = 0
+    
+    with open(srt_path, "w", encoding="utf-8") as f:
+        segment_index = 1
+        for segment in all_segments:
+            start = segment.get('start', 0)
+            end = segment.get('end', 0)
+            text = segment.get('text', '').strip()
+            
+            if is_hallucination(text, all_texts):
+                hallucination_count += 1
+                continue
+            
+            f.write(f"{segment_index}\n")
+            f.write(f"{format_time(start)} --> {format_time(end)}\n")
+            f.write(f"{text}\n\n")
+            segment_index += 1
+            valid_segments += 1
+    
+    if hallucination_count > 0:
+        print(f"🔍 {hallucination_count} hallucinations filtrées")
+    
+    print(f"✅ {valid_segments} segments → {srt_path}")
+    
+    # Aperçu
+    with open(srt_path, "r", encoding="utf-8") as f:
+        preview = f.read(600)
+        if preview.strip():
+            print(f"\n📄 Aperçu:\n{preview}")
+    
+    return srt_path
 
 
 def main():
@@ -325,8 +308,14 @@ def main():
     if not audio_path.exists():
         print(f"❌ Fichier introuvable: {audio_path}")
         sys.exit(1)
-    
-    transcribe_with_api(audio_path, args.language)
+
+    try:
+        transcribe_with_api(audio_path, args.language)
+    except Exception as e:
+        print(f"❌ Erreur lors de la transcription: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -4,37 +4,26 @@ Utilise l'API Groq (Llama 3) pour la traduction.
 """
 
 import os
+import re
 import sys
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from groq import Groq
-from dotenv import load_dotenv
 
 # Import des modules locaux
+from groq_client import get_client
 from translation_cache import (
-    get_cached_translation, 
-    cache_translation, 
+    get_cached_translation,
+    cache_translation,
     get_cache_stats
 )
 from languages import (
     get_translation_prompt,
+    get_batch_translation_prompt,
     WHISPER_LANGUAGES,
     TARGET_LANGUAGES
 )
 
-# Charger les variables d'environnement du fichier .env
-load_dotenv()
-
-# Récupération de la clé API depuis l'environnement
-api_key = os.getenv("GROQ_API_KEY")
-
-if not api_key:
-    print("❌ Erreur : La clé GROQ_API_KEY est introuvable dans le fichier .env")
-    sys.exit(1)
-
-# Configuration du client Groq
-client = Groq(api_key=api_key)
-
 
 def translate_text(text: str, source_lang: str = "ja", target_lang: str = "fr") -> str:
     """
@@ -51,13 +40,13 @@ def translate_text(text: str, source_lang: str = "ja", target_lang: str = "fr")
     # Vérifier le cache en premier
     cached = get_cached_translation(text, source_lang, target_lang)
     if cached:
-        return cached.get("translation", cached) if isinstance(cached, dict) else cached
+        return cached
     
     try:
         # Obtenir le prompt adapté
         system_prompt = get_translation_prompt(source_lang, target_lang)
         
-        chat_completion = client.chat.completions.create(
+        chat_completion = get_client().chat.completions.create(
             messages=[
                 {
                     "role": "system",
@@ -84,77 +73,199 @@ def translate_text(text: str, source_lang: str = "ja", target_lang: str = "fr")
         return text
 
 
+# Nombre maximum de répliques envoyées dans une seule requête de traduction
+BATCH_SIZE = 50
+
+# Nombre de lots en vol simultanément : la latence réseau domine chaque
+# requête, et le client Groq partagé multiplexe sur ses connexions
+# keep-alive. Volontairement bas pour rester sous les limites de débit.
+MAX_PARALLEL_BATCHES = 4
+
+# Format de ligne numérotée dans la réponse du modèle ("N. texte")
+_NUMBERED_LINE = re.compile(r'^\s*(\d+)[.)]\s*(.*\S)\s*$')
+
+# Bloc SRT complet : numéro, timestamps, texte (éventuellement multi-lignes,
+# jusqu'à la ligne vide suivante ou la fin du fichier)
+_SRT_CUE = re.compile(
+    r'(\d+)\s*\r?\n'
+    r'(\d{2}:\d{2}:\d{2}[,.]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[,.]\d{3})\s*\r?\n'
+    r'(.+?)(?=\r?\n\s*\r?\n|\Z)',
+    re.S
+)
+
+
+def parse_srt_blocks(srt_input: Path) -> list:
+    """
+    Parse un fichier SRT en une liste de blocs (num, times, text).
+
+    Un seul balayage du fichier par regex compilée (boucle en C) au lieu
+    d'une boucle Python ligne par ligne ; les textes multi-lignes sont
+    aplatis avec des espaces comme avant.
+    """
+    with open(srt_input, "r", encoding="utf-8") as f_in:
+        content = f_in.read()
+    return [
+        (m.group(1), m.group(2).strip(), " ".join(m.group(3).split()))
+        for m in _SRT_CUE.finditer(content)
+    ]
+
+
+def translate_batch(texts: list, source_lang: str = "ja", target_lang: str = "fr") -> list:
+    """
+    Traduit un lot de textes en une seule requête API.
+
+    Les textes sont envoyés sous forme de lignes numérotées et la réponse
+    est re-découpée par numéro. Les lignes que le modèle n'a pas rendues
+    (ou mal numérotées) sont re-traduites individuellement en secours.
+
+    Args:
+        texts: Liste des textes à traduire
+        source_lang: Code de la langue source
+        target_lang: Code de la langue cible
+
+    Returns:
+        Liste des traductions, dans le même ordre que les textes
+    """
+    if not texts:
+        return []
+
+    system_prompt = get_batch_translation_prompt(source_lang, target_lang, len(texts))
+    numbered = "\n".join(f"{i + 1}. {text}" for i, text in enumerate(texts))
+
+    translations = {}
+    try:
+        chat_completion = get_client().chat.completions.create(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": numbered},
+            ],
+            model="llama-3.3-70b-versatile",
+            temperature=0.3,
+        )
+        content = chat_completion.choices[0].message.content or ""
+
+        for line in content.splitlines():
+            match = _NUMBERED_LINE.match(line)
+            if match:
+                idx = int(match.group(1)) - 1
+                if 0 <= idx < len(texts):
+                    translations[idx] = match.group(2)
+    except Exception as e:
+        print(f"⚠️ Erreur lors de la traduction par lot: {e}")
+
+    results = []
+    for i, text in enumerate(texts):
+        translation = translations.get(i)
+        if translation is None:
+            # Secours : traduction individuelle (gère aussi son propre cache)
+            translation = translate_text(text, source_lang, target_lang)
+        else:
+            cache_translation(text, translation, source_lang, target_lang)
+        results.append(translation)
+
+    return results
+
+
+def translate_many(
+    texts: list,
+    source_lang: str = "ja",
+    target_lang: str = "fr",
+    batch_size: int = BATCH_SIZE
+) -> tuple:
+    """
+    Traduit une collection de textes (doublons acceptés).
+
+    Résout d'abord le cache, puis envoie uniquement les textes uniques
+    manquants, par lots parallèles. C'est le point d'entrée batch que
+    translate_srt (et tout autre appelant) utilise.
+
+    Args:
+        texts: Textes à traduire (l'ordre et les doublons sont ignorés)
+        source_lang: Code de la langue source
+        target_lang: Code de la langue cible
+        batch_size: Nombre de textes par requête API
+
+    Returns:
+        Tuple (dict texte → traduction, nombre traduit via l'API,
+        nombre de textes uniques servis par le cache)
+    """
+    # 1. Résoudre le cache et collecter les textes manquants (uniques)
+    translations = {}
+    misses = []
+    seen_misses = set()
+    cached_count = 0
+    for text in texts:
+        if text in translations or text in seen_misses:
+            continue
+        cached = get_cached_translation(text, source_lang, target_lang)
+        if cached is not None:
+            translations[text] = cached
+            cached_count += 1
+        else:
+            seen_misses.add(text)
+            misses.append(text)
+
+    # 2. Traduire les textes manquants par lots, plusieurs lots en vol
+    batches = [misses[i:i + batch_size] for i in range(0, len(misses), batch_size)]
+    if batches:
+        workers = min(MAX_PARALLEL_BATCHES, len(batches))
+        print(f"  🌐 {len(batches)} lot(s) de ≤{batch_size} répliques ({workers} en parallèle)")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                lambda b: translate_batch(b, source_lang, target_lang), batches
+            )
+            for batch, batch_translations in zip(batches, results):
+                for text, translation in zip(batch, batch_translations):
+                    translations[text] = translation
+
+    return translations, len(misses), cached_count
+
+
 def translate_srt(
-    srt_input: Path, 
-    srt_output: Path, 
-    source_lang: str = "ja", 
-    target_lang: str = "fr"
+    srt_input: Path,
+    srt_output: Path,
+    source_lang: str = "ja",
+    target_lang: str = "fr",
+    batch_size: int = BATCH_SIZE
 ) -> tuple:
     """
     Traduit un fichier SRT complet.
-    
+
+    Les répliques absentes du cache sont regroupées et envoyées par lots
+    (une requête API pour batch_size répliques au lieu d'une par réplique).
+
     Args:
         srt_input: Chemin du fichier SRT source
         srt_output: Chemin du fichier SRT de sortie
         source_lang: Code de la langue source
         target_lang: Code de la langue cible
-    
+        batch_size: Nombre de répliques par requête API
+
     Returns:
         Tuple (nombre de lignes traduites, nombre de lignes depuis le cache)
     """
-    translated_count = 0
-    cached_count = 0
-    
     print(f"🌐 Traduction {source_lang} → {target_lang}")
     print(f"📄 Source: {srt_input}")
     print(f"📄 Sortie: {srt_output}")
-    
-    with open(srt_input, "r", encoding="utf-8") as f_in, \
-         open(srt_output, "w", encoding="utf-8") as f_out:
-        
-        block = []
-        for line in f_in:
-            line_strip = line.strip()
-            if line_strip == "":
-                if len(block) >= 3:
-                    num = block[0]
-                    times = block[1]
-                    text = " ".join(block[2:])
-                    
-                    # Vérifier si c'est une traduction depuis le cache
-                    cached = get_cached_translation(text, source_lang, target_lang)
-                    
-                    # Traduction via API Groq (avec cache intégré)
-                    text_translated = translate_text(text, source_lang, target_lang)
-                    
-                    if cached:
-                        cached_count += 1
-                        print(f"  💾 [{num}] (cache)")
-                    else:
-                        translated_count += 1
-                        print(f"  ✅ [{num}] Traduit")
-                    
-                    f_out.write(f"{num}\n{times}\n{text_translated}\n\n")
-                block = []
-            else:
-                block.append(line_strip)
-        
-        # Traiter le dernier bloc s'il existe
-        if block and len(block) >= 3:
-            num = block[0]
-            times = block[1]
-            text = " ".join(block[2:])
-            
-            cached = get_cached_translation(text, source_lang, target_lang)
-            text_translated = translate_text(text, source_lang, target_lang)
-            
-            if cached:
-                cached_count += 1
-            else:
-                translated_count += 1
-                
-            f_out.write(f"{num}\n{times}\n{text_translated}\n\n")
-    
+
+    # 1. Parser le fichier en blocs (num, times, text)
+    blocks = parse_srt_blocks(srt_input)
+
+    # 2. Traduire les textes (cache d'abord, doublons envoyés une fois)
+    translations, translated_count, cached_count = translate_many(
+        [text for _, _, text in blocks], source_lang, target_lang, batch_size
+    )
+
+    # 3. Écrire le SRT traduit — fichier temporaire puis os.replace :
+    # le pipeline saute la traduction quand le fichier existe, donc un
+    # fichier partiellement écrit (crash, interruption) ne doit jamais
+    # être visible sous son nom final
+    tmp_output = srt_output.with_name(srt_output.name + ".tmp")
+    with open(tmp_output, "w", encoding="utf-8") as f_out:
+        for num, times, text in blocks:
+            f_out.write(f"{num}\n{times}\n{translations.get(text, text)}\n\n")
+    os.replace(tmp_output, srt_output)
+
     return translated_count, cached_count
 
 
@@ -183,6 +294,12 @@ def main():
         default=None,
         help="Fichier de sortie (défaut: {nom}_fr.srt)"
     )
+    parser.add_argument(
+        "-b", "--batch",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Nombre de répliques par requête API (défaut: {BATCH_SIZE})"
+    )
     parser.add_argument(
         "--stats",
         action="store_true",
@@ -199,8 +316,13 @@ def main():
         print(f"   • Paires de langues: {', '.join(stats['languages']) or 'Aucune'}")
         return
     
+    # Vérifier la clé API avant de démarrer
+    if not os.getenv("GROQ_API_KEY"):
+        print("❌ Erreur : La clé GROQ_API_KEY est introuvable dans le fichier .env")
+        sys.exit(1)
+
     srt_input = Path(args.srt_file)
-    
+
     if not srt_input.exists():
         print(f"❌ Fichier introuvable: {srt_input}")
         sys.exit(1)
@@ -221,10 +343,11 @@ def main():
     
     # Traduction
     translated, cached = translate_srt(
-        srt_input, 
-        srt_output, 
-        args.source, 
-        args.target
+        srt_input,
+        srt_output,
+        args.source,
+        args.target,
+        batch_size=max(1, args.batch)
     )
     
     print(f"\n{'='*50}")
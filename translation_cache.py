@@ -1,96 +1,230 @@
 """
 Module de cache pour les traductions.
 Évite de re-traduire des textes déjà traduits.
+
+Le cache est stocké dans une base SQLite (mode WAL) : une recherche est
+un simple accès B-tree au lieu du rechargement complet d'un fichier JSON
+à chaque appel. L'ancien cache JSON est importé automatiquement.
 """
 
 import json
+import re
+import sqlite3
 import hashlib
+import threading
 from pathlib import Path
 from typing import Optional
 
-# Fichier de cache
-CACHE_FILE = Path(__file__).parent / "translations_cache.json"
+# Base de cache SQLite
+CACHE_DB = Path(__file__).parent / "translations_cache.db"
+
+# Ancien fichier de cache JSON (importé puis renommé en .bak)
+LEGACY_CACHE_FILE = Path(__file__).parent / "translations_cache.json"
+
+# Connexion partagée, initialisée paresseusement
+_conn = None
+_conn_lock = threading.Lock()
 
 
 def get_cache_key(text: str, source_lang: str, target_lang: str) -> str:
-    """Génère une clé unique pour le cache basée sur le texte et les langues."""
+    """
+    Génère une clé unique pour le cache basée sur le texte et les langues.
+
+    blake2b (même algorithme que les identifiants de job) est plus rapide
+    que md5 et 16 octets suffisent largement pour éviter les collisions.
+    """
     content = f"{source_lang}:{target_lang}:{text}"
-    return hashlib.md5(content.encode('utf-8')).hexdigest()
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
 
 
-def load_cache() -> dict:
-    """Charge le cache depuis le fichier JSON."""
-    if CACHE_FILE.exists():
-        try:
-            with open(CACHE_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
-    return {}
+# Ponctuation finale ignorée par la correspondance approchée
+_TRAILING_PUNCT = re.compile(r"[.!?…~,;:‥。！？、\s]+$")
 
 
-def save_cache(cache: dict) -> None:
-    """Sauvegarde le cache dans le fichier JSON."""
+def normalize_text(text: str) -> str:
+    """
+    Normalise un texte pour la correspondance approchée du cache.
+
+    Les sous-titres contiennent beaucoup de quasi-doublons qui ne
+    diffèrent que par la casse, les espaces ou la ponctuation finale
+    (« Je vois. », « Je vois… », « Je vois ! ») : ils partagent la même
+    forme normalisée et donc la même traduction en cache.
+    """
+    text = " ".join(text.split()).lower()
+    return _TRAILING_PUNCT.sub("", text)
+
+
+def get_normalized_key(text: str, source_lang: str, target_lang: str) -> str:
+    """Clé de cache de la forme normalisée d'un texte."""
+    return get_cache_key(normalize_text(text), source_lang, target_lang)
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Retourne la connexion SQLite partagée (créée au premier appel)."""
+    global _conn
+    if _conn is None:
+        with _conn_lock:
+            if _conn is None:
+                conn = sqlite3.connect(
+                    str(CACHE_DB),
+                    isolation_level=None,       # autocommit
+                    check_same_thread=False,    # Streamlit peut changer de thread
+                )
+                # WAL : lectures sans verrou ; cache de pages de 64 MB
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA cache_size=-65536")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS translations (
+                        key TEXT PRIMARY KEY,
+                        source TEXT,
+                        translation TEXT,
+                        source_lang TEXT,
+                        target_lang TEXT
+                    ) WITHOUT ROWID
+                """)
+                # Migration : colonne de clé normalisée pour la
+                # correspondance approchée (bases créées avant son ajout)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(translations)")}
+                if "norm_key" not in columns:
+                    conn.execute("ALTER TABLE translations ADD COLUMN norm_key TEXT")
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_translations_norm "
+                    "ON translations(norm_key)"
+                )
+                _rekey_legacy_hashes(conn)
+                _import_legacy_cache(conn)
+                _conn = conn
+    return _conn
+
+
+def _rekey_legacy_hashes(conn: sqlite3.Connection) -> None:
+    """
+    Migre les clés md5 historiques vers blake2b (une seule fois).
+
+    Le texte source est stocké dans chaque ligne, donc les nouvelles clés
+    sont recalculables : aucune traduction n'est perdue au changement
+    d'algorithme. user_version sert de marqueur de migration.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+        return
+    rows = conn.execute(
+        "SELECT source, translation, source_lang, target_lang FROM translations"
+    ).fetchall()
+    if rows:
+        conn.execute("DELETE FROM translations")
+        conn.executemany(
+            "INSERT OR REPLACE INTO translations "
+            "(key, source, translation, source_lang, target_lang, norm_key) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (get_cache_key(source, src_lang, tgt_lang), source, translation,
+                 src_lang, tgt_lang, get_normalized_key(source, src_lang, tgt_lang))
+                for source, translation, src_lang, tgt_lang in rows
+            ]
+        )
+        print(f"💾 {len(rows)} clés de cache migrées vers blake2b")
+    conn.execute("PRAGMA user_version = 1")
+
+
+def _import_legacy_cache(conn: sqlite3.Connection) -> None:
+    """Importe l'ancien cache JSON dans SQLite (une seule fois)."""
+    if not LEGACY_CACHE_FILE.exists():
+        return
     try:
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
-    except IOError as e:
-        print(f"⚠️ Impossible de sauvegarder le cache: {e}")
+        with open(LEGACY_CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return
+
+    rows = [
+        (key, v.get("source", ""), v.get("translation", ""),
+         v.get("source_lang", ""), v.get("target_lang", ""),
+         get_normalized_key(v.get("source", ""), v.get("source_lang", ""), v.get("target_lang", "")))
+        for key, v in cache.items()
+        if isinstance(v, dict)
+    ]
+    if rows:
+        conn.executemany(
+            "INSERT OR IGNORE INTO translations "
+            "(key, source, translation, source_lang, target_lang, norm_key) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        print(f"💾 {len(rows)} traductions importées depuis l'ancien cache JSON")
+
+    # Renommer pour ne pas ré-importer au prochain démarrage
+    LEGACY_CACHE_FILE.rename(LEGACY_CACHE_FILE.with_suffix(".json.bak"))
 
 
 def get_cached_translation(text: str, source_lang: str, target_lang: str) -> Optional[str]:
     """
     Récupère une traduction depuis le cache.
-    
+
     Args:
         text: Texte source à traduire
         source_lang: Code de la langue source (ex: "ja", "en")
         target_lang: Code de la langue cible (ex: "fr")
-    
+
     Returns:
         La traduction mise en cache ou None si non trouvée
+
+    En cas d'absence de correspondance exacte, un second essai est fait
+    sur la forme normalisée (casse/espaces/ponctuation finale ignorées) :
+    « Je vois. » réutilise la traduction de « Je vois… ».
     """
-    cache = load_cache()
+    conn = _get_connection()
     key = get_cache_key(text, source_lang, target_lang)
-    return cache.get(key)
+    row = conn.execute(
+        "SELECT translation FROM translations WHERE key = ?", (key,)
+    ).fetchone()
+    if row:
+        return row[0]
+
+    norm_key = get_normalized_key(text, source_lang, target_lang)
+    row = conn.execute(
+        "SELECT translation FROM translations WHERE norm_key = ? LIMIT 1",
+        (norm_key,)
+    ).fetchone()
+    return row[0] if row else None
 
 
 def cache_translation(text: str, translation: str, source_lang: str, target_lang: str) -> None:
     """
     Met en cache une traduction.
-    
+
     Args:
         text: Texte source
         translation: Texte traduit
         source_lang: Code de la langue source
         target_lang: Code de la langue cible
     """
-    cache = load_cache()
     key = get_cache_key(text, source_lang, target_lang)
-    cache[key] = {
-        "source": text,
-        "translation": translation,
-        "source_lang": source_lang,
-        "target_lang": target_lang
-    }
-    save_cache(cache)
+    norm_key = get_normalized_key(text, source_lang, target_lang)
+    try:
+        _get_connection().execute(
+            "INSERT OR REPLACE INTO translations "
+            "(key, source, translation, source_lang, target_lang, norm_key) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, text, translation, source_lang, target_lang, norm_key)
+        )
+    except sqlite3.Error as e:
+        print(f"⚠️ Impossible de sauvegarder le cache: {e}")
 
 
 def get_cache_stats() -> dict:
-    """Retourne des statistiques sur le cache."""
-    cache = load_cache()
+    """Retourne des statistiques sur le cache (une requête, pas de scan Python)."""
+    pairs = _get_connection().execute(
+        "SELECT source_lang || '→' || target_lang, COUNT(*) "
+        "FROM translations GROUP BY source_lang, target_lang"
+    ).fetchall()
     return {
-        "total_entries": len(cache),
-        "languages": list(set(
-            f"{v['source_lang']}→{v['target_lang']}" 
-            for v in cache.values() 
-            if isinstance(v, dict)
-        ))
+        "total_entries": sum(count for _, count in pairs),
+        "languages": [f"{pair} ({count})" for pair, count in pairs]
     }
 
 
 def clear_cache() -> None:
     """Vide complètement le cache."""
-    if CACHE_FILE.exists():
-        CACHE_FILE.unlink()
-        print("🗑️ Cache de traductions vidé")
+    _get_connection().execute("DELETE FROM translations")
+    print("🗑️ Cache de traductions vidé")
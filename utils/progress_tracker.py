@@ -8,15 +8,20 @@ from typing import Optional
 
 class ProgressTracker:
     """
-    Utility class to track and display progress during processing
+    Utility class to track and display progress during processing.
+
+    Progress lives inside an st.status container: the current stage is
+    shown as the container label (with a running spinner) and collapses
+    into a single "done" line when the pipeline completes.
     """
-    
+
     def __init__(self, total_steps: int):
         self.total_steps = total_steps
         self.current_step = 0
-        self.progress_bar = st.progress(0)
-        self.status_text = st.empty()
-    
+        self.status = st.status("🚀 Traitement en cours...", expanded=True)
+        with self.status:
+            self.progress_bar = st.progress(0)
+
     def update(self, step: int, message: str) -> None:
         """
         Update the progress bar and status message
@@ -24,19 +29,23 @@ class ProgressTracker:
         self.current_step = step
         progress_percentage = min(100, int((step / self.total_steps) * 100))
         self.progress_bar.progress(progress_percentage)
-        self.status_text.info(message)
-    
+        self.status.update(label=message)
+
     def complete(self) -> None:
         """
         Mark the process as complete
         """
         self.progress_bar.progress(100)
-        self.status_text.success("✅ Traitement terminé avec succès !")
-    
+        self.status.update(
+            label="✅ Traitement terminé avec succès !",
+            state="complete",
+            expanded=False
+        )
+
     def reset(self) -> None:
         """
         Reset the progress tracker
         """
         self.current_step = 0
         self.progress_bar.progress(0)
-        self.status_text.empty()
\ No newline at end of file
+        self.status.update(label="🚀 Traitement en cours...", state="running")